@@ -1,6 +1,8 @@
 import pdfplumber
 import re
 from datetime import datetime
+import numpy as np
+from cell_parse import stacked_qty_column, valid_part_numbers
 
 # ==============================
 # TEMP CUSTOMER LIBRARY
@@ -17,22 +19,6 @@ def parse_date(date_str: str, year=2025):
     """Convert '16/10' to datetime with default year."""
     return datetime.strptime(f"{date_str}/{year}", "%d/%m/%Y")
 
-def is_valid_part_number(value: str) -> bool:
-    """Check if string looks like a part number (e.g. B17-E461A-10-C)."""
-    if not value:
-        return False
-    return bool(re.match(r"^[A-Z0-9\-]+$", value.strip()))
-
-def clean_cell(value: str):
-    """Clean cell values (handle stacked text like '200\\n800')."""
-    if not value:
-        return None
-    parts = value.split("\n")
-    try:
-        return sum(int(p) for p in parts if p.isdigit())
-    except:
-        return value.strip()
-
 # ==============================
 # HEADER EXTRACTION
 # ==============================
@@ -123,22 +109,21 @@ def extract_firm_period_rows(pdf_path: str, header_data: dict):
                     except:
                         pass
 
-                # Process rows
-                for row in table[1:]:
-                    part_number = row[1]
-                    if not is_valid_part_number(part_number):
-                        continue
+                # Process rows, one column at a time (stacked '200\n800' cells summed)
+                rows = table[1:]
+                part_numbers = [row[1] for row in rows]
+                valid = valid_part_numbers(part_numbers)
+                qty_cols = {i: stacked_qty_column([row[i] for row in rows]) for i in date_cols}
+                date_strs = {i: d.strftime("%d/%m/%Y") for i, d in date_cols.items()}
 
-                    for i, d in date_cols.items():
-                        qty = clean_cell(row[i])
-                        if qty is None:
-                            qty = 0
+                for r in np.flatnonzero(valid).tolist():
+                    for i in date_cols:
                         results.append([
                             sched_no,
                             cust_code,
-                            part_number,
-                            d.strftime("%d/%m/%Y"),
-                            qty
+                            part_numbers[r],
+                            date_strs[i],
+                            int(qty_cols[i][r])
                         ])
     return results
 
@@ -1,4 +1,5 @@
 import pdfplumber
+from cell_parse import split_part_column
 
 def extract_parts(pdf_path):
     results = []
@@ -9,22 +10,13 @@ def extract_parts(pdf_path):
                 if not table:
                     continue
 
-                for row in table[1:]:  # skip header row
-                    col0 = row[0]
-                    if not col0:
-                        continue
-
-                    # Split Part Name and Part Number
-                    parts = col0.split("\n")
-                    if len(parts) == 2:
-                        part_name, part_number = parts
-                    else:
-                        # if formatting error, keep first as name
-                        part_name, part_number = parts[0], None
-
+                # Split Part Name and Part Number (no number on a formatting error)
+                col0 = [row[0] if row else None for row in table[1:]]  # skip header row
+                names, numbers, paired = split_part_column(col0)
+                for i in (i for i, cell in enumerate(col0) if cell):
                     results.append({
-                        "Part Name": part_name.strip(),
-                        "Part Number": part_number.strip() if part_number else None
+                        "Part Name": names[i],
+                        "Part Number": numbers[i] if paired[i] and numbers[i] else None
                     })
     return results
 
@@ -1,18 +1,5 @@
 import pdfplumber
-
-def clean_cell_firstline(value: str):
-    """Return first non-empty line, else 0."""
-    if not value:
-        return 0
-    parts = value.split("\n")
-    for p in parts:
-        p = p.strip()
-        if p:
-            try:
-                return int(p)
-            except:
-                return 0
-    return 0
+from cell_parse import first_line_qty_column, split_part_column
 
 def extract_parts_and_DI(pdf_path):
     results = []
@@ -26,29 +13,20 @@ def extract_parts_and_DI(pdf_path):
                 headers = table[0]  # date headers
                 firm_period_cols = headers[2:18]  # firm period col range
 
-                for row in table[2:]:  # skip header rows
-                    if not row or not row[0]:
-                        continue
+                rows = [row for row in table[2:] if row and row[0]]  # skip header rows
+                names, numbers, paired = split_part_column([row[0] for row in rows])
 
-                    # Split part name & number
-                    parts = row[0].split("\n")
-                    if len(parts) == 2:
-                        part_name, part_number = parts
-                    else:
-                        part_name, part_number = parts[0], None
+                # Extract DI quantities (first line of a stacked cell), column by column
+                qty_cols = []
+                for i, h in enumerate(firm_period_cols, start=2):
+                    raw_cells = [row[i] for row in rows]   # get raw content
+                    qty_cols.append(first_line_qty_column(raw_cells))
 
-                    # Extract DI quantities
-                    di_data = []
-                    for i, h in enumerate(firm_period_cols, start=2):  
-                        raw_cell = row[i]   # get raw content
-                        print(f"DEBUG Row[{i}] Header={h} Raw={repr(raw_cell)}")  # <-- see exact format
-                        
-                        qty = clean_cell_firstline(raw_cell)
-                        di_data.append((h, qty))
+                for r in range(len(rows)):
                     results.append({
-                        "Part Name": part_name.strip(),
-                        "Part Number": part_number.strip() if part_number else None,
-                        "DI": di_data
+                        "Part Name": names[r],
+                        "Part Number": numbers[r] if paired[r] and numbers[r] else None,
+                        "DI": [(h, int(qty[r])) for h, qty in zip(firm_period_cols, qty_cols)]
                     })
     return results
 
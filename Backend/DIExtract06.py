@@ -5,6 +5,8 @@ import os
 import cv2
 import pandas as pd
 import datetime
+import numpy as np
+from cell_parse import split_part_column
 
 
 customer = {
@@ -63,20 +65,18 @@ def extract_part(page, page_no=1):
     if not table:
         return partdetails
 
-    for row_idx, row in enumerate(table[1:], start=1):  # skip header row
-        if row and row[0]:
-            parts = row[0].split("\n")
-            if len(parts) == 2:
-                part_desc, part_num = parts[0].strip(), parts[1].strip()
-                partdetails.append({
-                    "page": page_no,
-                    "row": row_idx,
-                    "part_desc": part_desc,
-                    "part_num": part_num,
-                    "qty_img": None,
-                    "qty_ocr": None,
-                    "qty_values": None,
-                })
+    rows = table[1:]  # skip header row
+    part_descs, part_nums, paired = split_part_column([row[0] if row else None for row in rows])
+    for i in np.flatnonzero(paired).tolist():
+        partdetails.append({
+            "page": page_no,
+            "row": i + 1,
+            "part_desc": part_descs[i],
+            "part_num": part_nums[i],
+            "qty_img": None,
+            "qty_ocr": None,
+            "qty_values": None,
+        })
     return partdetails
 
 # ==============================
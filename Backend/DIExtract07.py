@@ -1,10 +1,25 @@
 import pdfplumber
+from pdfplumber import utils
 import re
 import pytesseract
 import os
 import cv2
 import pandas as pd
 import datetime
+import functools
+import numpy as np
+import gc
+import math
+from di_matrix import DIMatrix, parse_qty
+from pdf_render import open_document, render_clip_gray
+from ocr_preprocess import clean_image, tight_crop
+from cell_parse import split_part_column
+import table_geometry
+
+try:
+    import psutil  # optional, for the low-memory RSS budget
+except ImportError:
+    psutil = None
 
 
 customer = {
@@ -15,39 +30,82 @@ customer = {
 # ==============================
 # HEADER EXTRACTION
 # ==============================
-def extract_header(page, customer_lib: dict) -> dict:
+# Every header field sits above the qty table, so only that band of page 1
+# is turned into text (the DI template: page top down to the region
+# crop_region() reads), whatever the size of the table below. All fields and
+# the customer names are matched in a single pass of one combined pattern;
+# the first match of each field wins.
+HEADER_BAND_PCT = (0.0, 1.0, 1.0, 0.75)  # percent_bbox() convention
+
+_HEADER_FIELDS = (
+    r"(?i:Purchase Schedule No\.?:)\s*(?P<schedule>\S+)",
+    r"Firm Period\s*:\s*(?P<firm_period>(?P<firm_start>\S+)\s+to\s+(?P<firm_end>\S+))",
+    # first d/m-d/m range on the "Part Number Forecast" table header line
+    r"Forecast\b[^\n]*?\b(?P<fc_start_d>\d{1,2})/(?P<fc_start_m>\d{1,2})-(?P<fc_end_d>\d{1,2})/(?P<fc_end_m>\d{1,2})\b",
+)
+
+
+@functools.lru_cache(maxsize=8)
+def header_pattern(customer_names=()):
+    """Compiled single-pass header regex (longest customer name tried first)."""
+    alternatives = list(_HEADER_FIELDS)
+    if customer_names:
+        names = sorted(customer_names, key=len, reverse=True)
+        alternatives.append("(?P<customer>" + "|".join(map(re.escape, names)) + ")")
+    return re.compile("|".join(f"(?:{a})" for a in alternatives))
+
+
+def match_header_fields(text, customer_names=()):
+    """{group name: first value} of every header field found in text."""
+    found = {}
+    for match in header_pattern(tuple(customer_names)).finditer(text):
+        for name, value in match.groupdict().items():
+            if value is not None and name not in found:
+                found[name] = value
+    return found
+
+
+def extract_header(page, customer_lib: dict, band_pct=HEADER_BAND_PCT) -> dict:
     header_data = {
         "Purchase Schedule No": None,
         "Firm Period": None,
         "Customer Name": None,
         "Customer Code": None,
         "Firm Start": None,
-        "Firm End": None
+        "Firm End": None,
+        "Forecast Start": None,
+        "Forecast End": None
     }
 
     try:
-        text = page.extract_text() or ""
+        x0, top, x1, bottom = percent_bbox(page, *band_pct)
+        # chars picked straight from the page: page.crop() would clip every
+        # object (table rules included) to the band first
+        band_chars = [c for c in page.chars
+                      if c["top"] >= top and c["bottom"] <= bottom and c["x0"] >= x0 and c["x1"] <= x1]
+        text = utils.extract_text(band_chars) or ""
+        found = match_header_fields(text, tuple(customer_lib))
 
         # Purchase Schedule
-        match_schedule = re.search(r"Purchase Schedule No\.?:\s*(\S+)", text, re.IGNORECASE)
-        if match_schedule:
-            header_data["Purchase Schedule No"] = match_schedule.group(1)
+        header_data["Purchase Schedule No"] = found.get("schedule")
 
         # Firm Period
-        match_firm = re.search(r"Firm Period\s*:\s*(.+)", text)
-        if match_firm:
-            firm_period = match_firm.group(1).strip()
-            header_data["Firm Period"] = firm_period
-            start_str, end_str = firm_period.split(" to ")
-            header_data["Firm Start"] = datetime.datetime.strptime(start_str.strip(), "%d-%m-%Y")
-            header_data["Firm End"] = datetime.datetime.strptime(end_str.strip(), "%d-%m-%Y")
+        if "firm_period" in found:
+            header_data["Firm Period"] = found["firm_period"]
+            header_data["Firm Start"] = datetime.datetime.strptime(found["firm_start"], "%d-%m-%Y")
+            header_data["Firm End"] = datetime.datetime.strptime(found["firm_end"], "%d-%m-%Y")
+
+        # Forecast period (the header only has day/month; year follows Firm End)
+        if "fc_start_d" in found and header_data["Firm End"]:
+            start_d, start_m, end_d, end_m = (int(found[k]) for k in ("fc_start_d", "fc_start_m", "fc_end_d", "fc_end_m"))
+            start_year = header_data["Firm End"].year + (start_m < header_data["Firm End"].month)
+            header_data["Forecast Start"] = datetime.datetime(start_year, start_m, start_d)
+            header_data["Forecast End"] = datetime.datetime(start_year + (end_m < start_m), end_m, end_d)
 
         # Customer
-        for name, code in customer_lib.items():
-            if name in text:
-                header_data["Customer Name"] = name
-                header_data["Customer Code"] = code
-                break
+        if "customer" in found:
+            header_data["Customer Name"] = found["customer"]
+            header_data["Customer Code"] = customer_lib[found["customer"]]
 
     except Exception as e:
         print(f"⚠️ Error reading PDF header: {e}")
@@ -57,26 +115,38 @@ def extract_header(page, customer_lib: dict) -> dict:
 # ==============================
 # PART EXTRACTION
 # ==============================
-def extract_part(page, page_no=1):
+def extract_part(page, page_no=1, customer_code=None):
+    """
+    Part rows of the page's table. With customer_code the table layout is
+    taken from the template cache (table_geometry) instead of running
+    pdfplumber's table finder on every page.
+    """
     partdetails = []
-    table = page.extract_table()
-    if not table:
+    if customer_code:
+        cells = table_geometry.part_column(page, customer_code)
+    else:
+        table = page.extract_table()
+        if not table:
+            return partdetails
+        cells = [(row_idx, row[0]) for row_idx, row in enumerate(table[1:], start=1) if row]  # skip header row
+
+    if not cells:
         return partdetails
-
-    for row_idx, row in enumerate(table[1:], start=1):  # skip header row
-        if row and row[0]:
-            parts = row[0].split("\n")
-            if len(parts) == 2:
-                part_desc, part_num = parts[0].strip(), parts[1].strip()
-                partdetails.append({
-                    "page": page_no,
-                    "row": row_idx,
-                    "part_desc": part_desc,
-                    "part_num": part_num,
-                    "qty_img": None,
-                    "qty_ocr": None,
-                    "qty_values": None,
-                })
+    row_ids, texts = zip(*cells)
+    part_descs, part_nums, paired = split_part_column(texts)
+    for i in np.flatnonzero(paired).tolist():
+        partdetails.append({
+            "page": page_no,
+            "row": row_ids[i],
+            "part_desc": part_descs[i],
+            "part_num": part_nums[i],
+            "qty_img": None,
+            "qty_ocr": None,
+            "qty_values": None,
+            "forecast_img": None,
+            "forecast_ocr": None,
+            "forecast_values": None,
+        })
     return partdetails
 
 # ==============================
@@ -127,10 +197,186 @@ def ocr_row_by_cells(row_img_path, num_cols=16, pad=3):
 
     return results
 
+# ==============================
+# CELL OCR (fixed / confidence-checked)
+# ==============================
+OCR_CONFIG = "--psm 7 digits"
+PAD_DPI = 300            # `pad` (pixels) was tuned at this resolution
+OCR_CONF_THRESHOLD = 80  # tesseract word confidence (0-100) needed to keep a low-DPI read
+MAX_QTY = 999999         # anything larger is a misread
+INK_MIN_FRACTION = 0.01  # dark-pixel share of a cell's interior that means "not blank"
+
+
+def ocr_cell(cell):
+    """One cell -> int (blank = 0)."""
+    return parse_qty(pytesseract.image_to_string(cell, config=OCR_CONFIG).strip())
+
+
+def has_ink(cell, margin_y=0.05, margin_x=0.1):
+    """
+    True when the cell holds dark pixels once the column grid lines (the
+    `pad` pixels either side) are trimmed off. Glyphs clipped by the firm
+    crop's bottom edge count as ink.
+    """
+    h, w = cell.shape
+    inner = cell[int(h * margin_y):h - int(h * margin_y), int(w * margin_x):w - int(w * margin_x)]
+    return inner.size > 0 and np.count_nonzero(inner < 128) > INK_MIN_FRACTION * inner.size
+
+
+def _judge_words(words, conf_threshold):
+    """[(text, conf), ...] of one cell -> (value, trusted)."""
+    text = "".join(t for t, _ in words)
+    value = parse_qty(text)
+    trusted = (
+        min(c for _, c in words) >= conf_threshold
+        and text.isdigit()
+        and value <= MAX_QTY
+    )
+    return value, trusted
+
+
+def ocr_cell_checked(cell, conf_threshold=OCR_CONF_THRESHOLD):
+    """
+    OCR with tesseract's word confidences. Returns (value, trusted): not
+    trusted when confidence is low, the text is not a sane quantity, or the
+    read is blank although the cell has ink.
+    """
+    data = pytesseract.image_to_data(cell, config=OCR_CONFIG, output_type=pytesseract.Output.DICT)
+    words = [(str(t).strip(), float(c)) for t, c in zip(data["text"], data["conf"]) if str(t).strip()]
+    if not words:
+        return 0, not has_ink(cell)
+    return _judge_words(words, conf_threshold)
+
+# ==============================
+# PAGE MONTAGE OCR
+# ==============================
+# All inked cells of a page pasted into fixed slots of one white sheet,
+# MONTAGE_COLS slots per line, separated by blank gutters MONTAGE_GAP cell
+# heights wide (wide enough that tesseract never joins two slots into one
+# word). One sparse-text OCR call with box output; each word goes back to
+# the slot its box centre falls in.
+
+MONTAGE_CONFIG = "--psm 11 digits"
+MONTAGE_COLS = 8
+MONTAGE_GAP = 1.5
+
+
+def ocr_montage(cells, conf_threshold=OCR_CONF_THRESHOLD):
+    """List of cell images -> [(value, trusted), ...] in the same order."""
+    if not cells:
+        return []
+    slot_h = max(c.shape[0] for c in cells)
+    slot_w = max(c.shape[1] for c in cells)
+    gap = max(int(slot_h * MONTAGE_GAP), 1)
+    pitch_y, pitch_x = slot_h + gap, slot_w + gap
+    n_lines = -(-len(cells) // MONTAGE_COLS)
+
+    sheet = np.full((gap + n_lines * pitch_y, gap + min(len(cells), MONTAGE_COLS) * pitch_x), 255, dtype=np.uint8)
+    for i, cell in enumerate(cells):
+        line, slot = divmod(i, MONTAGE_COLS)
+        y, x = gap + line * pitch_y, gap + slot * pitch_x
+        sheet[y:y + cell.shape[0], x:x + cell.shape[1]] = cell
+
+    data = pytesseract.image_to_data(sheet, config=MONTAGE_CONFIG, output_type=pytesseract.Output.DICT)
+    words = [[] for _ in cells]
+    for text, conf, left, top, width, height in zip(
+            data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]):
+        text = str(text).strip()
+        if not text:
+            continue
+        cy = top + height / 2 - gap
+        cx = left + width / 2 - gap
+        line, slot = int(cy // pitch_y), int(cx // pitch_x)
+        # centre in a gutter or outside the grid: not a cell read
+        if cy < 0 or cx < 0 or slot >= MONTAGE_COLS or cy - line * pitch_y > slot_h or cx - slot * pitch_x > slot_w:
+            continue
+        i = line * MONTAGE_COLS + slot
+        if i < len(cells):
+            words[i].append((left, text, float(conf)))
+
+    # Every slot holds an inked cell, so an empty read is never trusted
+    return [_judge_words([(t, c) for _, t, c in sorted(w)], conf_threshold) if w else (0, False)
+            for w in words]
+
+UNDERLINE_MAX_FRACTION = 0.08  # an ink run at most this tall (share of the row) is the firm underline
+
+
+def ink_runs(img):
+    """(first, last) pixel rows of each run of rows holding any dark pixel."""
+    ys = np.flatnonzero(np.count_nonzero(img < 128, axis=1))
+    if ys.size == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(ys) > 1)
+    return list(zip(ys[np.append(0, breaks + 1)].tolist(), ys[np.append(breaks, ys.size - 1)].tolist()))
+
+
+def forecast_band_top(img, default, margin=2):
+    """
+    First pixel row of a DI row's forecast line. A pixel row counts as ink if
+    any of its pixels is dark, so a lone digit in one cell keeps its full
+    height. The firm line is the first ink run plus an underline-thin run
+    right after it; the forecast band starts just above the next run, or
+    after the firm line when the row has no forecast. The fixed 13-row grid
+    drifts down the page, so a fixed ratio would cut the forecast digits of
+    the first rows. A row with a single line of text is split around it; a
+    blank row, or one whose only run is taller than `default` (firm and
+    forecast with no blank pixel row between them), uses `default`.
+    """
+    runs = ink_runs(img)
+    if not runs:
+        return default
+    if len(runs) == 1:
+        first, last = runs[0]
+        if last - first + 1 > default:
+            return default
+        # one line only: firm if it sits above `default`, forecast otherwise
+        if (first + last) / 2 < default:
+            return last + 1
+        return max(first - margin, 0)
+    firm_end = runs[0][1]
+    rest = runs[1:]
+    if rest[0][1] - rest[0][0] + 1 <= UNDERLINE_MAX_FRACTION * img.shape[0]:
+        firm_end = rest.pop(0)[1]
+    if not rest:
+        return firm_end + 1
+    return max(rest[0][0] - margin, firm_end + 1)
+
+
+def reread_cell(pdfium_page, cell_bbox, dpi, preprocess=False):
+    """OCR one cell re-rendered on its own at `dpi` (adaptive escalation)."""
+    cell = render_clip_gray(pdfium_page, cell_bbox, dpi)
+    if preprocess:
+        cell = tight_crop(clean_image(cell, dpi), dpi)
+        if cell is None:
+            return 0
+    return ocr_cell(cell)
+
 # ==============================
 # CROP ROWS + OCR COLUMNS
 # ==============================
-def crop_qty_rows(cropped_page, partdetails, page_num=1, out_dir="rows_out", num_cols=16, pad=3):
+def crop_qty_rows(cropped_page, partdetails, page_num=1, out_dir="rows_out", num_cols=16, pad=3,
+                  pdfium_page=None, dpi=300, save_images=True,
+                  adaptive=False, low_dpi=150, conf_threshold=OCR_CONF_THRESHOLD, montage=False,
+                  preprocess=False, forecast=False, ocr_stats=None):
+    """
+    pdfium_page (pypdfium2 page of the same PDF) switches rendering to one
+    grayscale clip of the qty region at `dpi`, sliced per row in memory,
+    instead of a pdfplumber RGB render + PNG round trip per row.
+    save_images=False skips writing the row / firm / cell PNGs.
+    forecast=True also OCRs the bottom half of every row (forecast figures)
+    from the same row buffer: part["forecast_values"] / ["forecast_ocr"].
+
+    adaptive=True (needs pdfium_page) reads every cell at `low_dpi` first and
+    re-renders at `dpi` only the cells ocr_cell_checked() does not trust.
+    montage=True OCRs all inked cells of the page in one ocr_montage() call
+    (blank cells are 0 without OCR); combines with adaptive.
+    preprocess=True binarizes the rendered image and strips its ruling lines
+    once (ocr_preprocess.clean_image), then tight-crops every cell to its
+    digits; blank cells are 0 without OCR.
+    ocr_stats, if given, accumulates {"cells", "escalated", "ocr_calls"}.
+    """
+    if adaptive and pdfium_page is None:
+        raise ValueError("adaptive OCR needs the pdfium render backend")
     os.makedirs(out_dir, exist_ok=True)
 
     parts_for_page = [p for p in partdetails if p["page"] == page_num]
@@ -151,9 +397,23 @@ def crop_qty_rows(cropped_page, partdetails, page_num=1, out_dir="rows_out", num
     FIRM_RATIO = 0.50         # default: cut row in half (50%). Adjust if Firm is not exactly half
     FIRM_TOP_OFFSET = 0       # trim inside firm crop from the top
     FIRM_BOTTOM_OFFSET = 0    # trim inside firm crop from the bottom
+    FORECAST_TOP_OFFSET = 0   # trim inside forecast crop (starts at forecast_band_top) from the top
+    FORECAST_BOTTOM_OFFSET = 0  # trim inside forecast crop from the bottom
     # ==============================
 
     new_partdetails = []
+    rows = []      # [idx, part, {half: values}, {half: file}, escalated, ocr_calls] per cropped row
+    pending = []   # (row, half, col, cell, cell_bbox) waiting for the page montage
+
+    region = None
+    render_dpi = low_dpi if adaptive else dpi
+    pad_px = max(int(round(pad * render_dpi / PAD_DPI)), 1) if pad else 0
+    if pdfium_page is not None:
+        region = render_clip_gray(pdfium_page, cropped_page.bbox, render_dpi)
+        if preprocess:
+            region = clean_image(region, render_dpi, num_cols, pad_px)
+        scale = render_dpi / 72.0
+        origin = math.floor(y0 * scale)  # pixel row 0 of region, see render_clip_gray
 
     # loop over detected part numbers, position on fixed 13-row grid
     for idx, part in enumerate(parts_for_page):
@@ -171,173 +431,311 @@ def crop_qty_rows(cropped_page, partdetails, page_num=1, out_dir="rows_out", num
             continue
 
         row_bbox = (x0, row_bottom, x1, row_top)
-        row_img = cropped_page.crop(row_bbox).to_image(resolution=300)
-
-        # Save full row image
         row_file = f"{out_dir}/page{page_num}_row{idx+1}.png"
-        row_img.save(row_file, format="PNG")
 
-        # Load row into cv2
-        img = cv2.imread(row_file, cv2.IMREAD_GRAYSCALE)
+        if region is not None:
+            # Row = slice (view) of the grayscale region
+            py0 = max(int(round(row_bottom * scale)) - origin, 0)
+            py1 = min(int(round(row_top * scale)) - origin, region.shape[0])
+            img = region[py0:py1, :]
+            if save_images:
+                cv2.imwrite(row_file, img)
+        else:
+            row_page = cropped_page.crop(row_bbox)
+            row_img = row_page.to_image(resolution=render_dpi)
+
+            # Save full row image
+            row_img.save(row_file, format="PNG")
+
+            # Rendered bitmap is on disk now; drop it (and the crop's caches) right away
+            row_img.original.close()
+            row_page.close()
+            del row_img, row_page
+
+            # Load row into cv2
+            img = cv2.imread(row_file, cv2.IMREAD_GRAYSCALE)
+            if preprocess:
+                img = clean_image(img, render_dpi, num_cols, pad_px)
         h, w = img.shape
 
-        # Firm crop (top half)
+        # Firm crop (top half); forecast crop (bottom half) from the same buffer
         half_h = int(h * FIRM_RATIO)
-        y0_f = max(0, FIRM_TOP_OFFSET)
-        y1_f = max(0, half_h - FIRM_BOTTOM_OFFSET)
-        if y1_f <= y0_f:
+        bands = {"firm": (max(0, FIRM_TOP_OFFSET), max(0, half_h - FIRM_BOTTOM_OFFSET))}
+        if forecast:
+            forecast_top = forecast_band_top(img, half_h)
+            bands["forecast"] = (forecast_top + FORECAST_TOP_OFFSET, h - FORECAST_BOTTOM_OFFSET)
+        if bands["firm"][1] <= bands["firm"][0]:
             print(f"⚠️ Skipping firm crop for row {idx+1}, invalid bounds")
             continue
 
-        firm_img = img[y0_f:y1_f, :]
-
-        # Save Firm-only image
-        firm_file = f"{out_dir}/page{page_num}_row{idx+1}_firm.png"
-        cv2.imwrite(firm_file, firm_img)
-
-        # Folder for firm columns
-        row_folder = f"{out_dir}/page{page_num}_row{idx+1}_firm"
-        os.makedirs(row_folder, exist_ok=True)
-
-        # Split into columns + OCR
         cell_width = w // num_cols
-        values = []
-        for col_idx in range(num_cols):
-            cx0 = max(col_idx * cell_width - pad, 0)
-            cx1 = min((col_idx + 1) * cell_width + pad, w)
-            cell = firm_img[:, cx0:cx1]
-
-            col_file = f"{row_folder}/col{col_idx+1}.png"
-            cv2.imwrite(col_file, cell)
+        values = {}
+        files = {}
+        escalated = calls = 0
+        for half, (hy0, hy1) in bands.items():
+            values[half] = [0] * num_cols
+            if hy1 <= hy0:
+                print(f"⚠️ Skipping {half} crop for row {idx+1}, invalid bounds")
+                continue
 
-            text = pytesseract.image_to_string(cell, config="--psm 7 digits").strip()
-            values.append(re.sub(r"\D", "", text) if text else "0")
+            half_img = img[hy0:hy1, :]
+
+            # Save Firm-only / Forecast-only image
+            half_file = f"{out_dir}/page{page_num}_row{idx+1}_{half}.png"
+            row_folder = f"{out_dir}/page{page_num}_row{idx+1}_{half}"
+            files[half] = half_file if save_images else None
+            if save_images:
+                cv2.imwrite(half_file, half_img)
+
+                # Folder for the half's columns
+                os.makedirs(row_folder, exist_ok=True)
+
+            # Split into columns + OCR
+            for col_idx in range(num_cols):
+                cx0 = max(col_idx * cell_width - pad_px, 0)
+                cx1 = min((col_idx + 1) * cell_width + pad_px, w)
+                cell = half_img[:, cx0:cx1]
+                if preprocess:
+                    cell = tight_crop(cell, render_dpi)
+                    if cell is None:
+                        continue  # blank
+
+                if save_images:
+                    cv2.imwrite(f"{row_folder}/col{col_idx+1}.png", cell)
+
+                cell_bbox = None
+                if adaptive:
+                    # Same cell, as a fraction of the row, for a full-dpi re-render
+                    row_h = row_top - row_bottom
+                    cell_bbox = (
+                        x0 + (x1 - x0) * cx0 / w,
+                        row_bottom + row_h * hy0 / h,
+                        x0 + (x1 - x0) * cx1 / w,
+                        row_bottom + row_h * hy1 / h,
+                    )
+
+                if montage:
+                    # Read after the page's last row, in one OCR call
+                    if preprocess or has_ink(cell):
+                        pending.append((len(rows), half, col_idx, cell, cell_bbox))
+                    continue
+
+                calls += 1
+                if not adaptive:
+                    values[half][col_idx] = ocr_cell(cell)
+                    continue
+
+                value, trusted = ocr_cell_checked(cell, conf_threshold)
+                if not trusted:
+                    value = reread_cell(pdfium_page, cell_bbox, dpi, preprocess)
+                    escalated += 1
+                    calls += 1
+                values[half][col_idx] = value
+
+        rows.append([idx, part, values, files, escalated, calls])
+
+    if pending:
+        reads = ocr_montage([cell for _, _, _, cell, _ in pending], conf_threshold)
+        for (row, half, col_idx, _, cell_bbox), (value, trusted) in zip(pending, reads):
+            if adaptive and not trusted:
+                value = reread_cell(pdfium_page, cell_bbox, dpi, preprocess)
+                rows[row][4] += 1
+                rows[row][5] += 1
+            rows[row][2][half][col_idx] = value
+
+    for idx, part, values, files, escalated, calls in rows:
+        if ocr_stats is not None:
+            ocr_stats["cells"] = ocr_stats.get("cells", 0) + num_cols * len(values)
+            ocr_stats["escalated"] = ocr_stats.get("escalated", 0) + escalated
+            ocr_stats["ocr_calls"] = ocr_stats.get("ocr_calls", 0) + calls
 
         # Update part info directly
-        qty_str = "|".join(values)
-        part["qty_img"] = firm_file
-        part["qty_values"] = values
+        qty_str = "|".join(map(str, values["firm"]))
+        part["qty_img"] = files.get("firm")
+        part["qty_values"] = np.array(values["firm"], dtype=np.int32)
         part["qty_ocr"] = qty_str
+        if "forecast" in values:
+            part["forecast_img"] = files.get("forecast")
+            part["forecast_values"] = np.array(values["forecast"], dtype=np.int32)
+            part["forecast_ocr"] = "|".join(map(str, values["forecast"]))
 
         new_partdetails.append(part)
 
         # ✅ Print with actual OCR values
-        print(f"✅ Page {page_num} Row {idx+1} Firm OCR: {qty_str}")
+        print(f"✅ Page {page_num} Row {idx+1} Firm OCR: {qty_str}"
+              + (f" ({escalated} cell(s) re-read at {dpi} DPI)" if escalated else ""))
+        if "forecast" in values:
+            print(f"✅ Page {page_num} Row {idx+1} Forecast OCR: {part['forecast_ocr']}")
+
+    if pending and ocr_stats is not None:
+        ocr_stats["ocr_calls"] = ocr_stats.get("ocr_calls", 0) + 1
 
     return new_partdetails
 
 
 def expand_to_db_rows(header, partdetails):
     """
-    Explanation of this function:
-    Transform the extracted parts into database-ready records.
-    Each quantity value (qty_values[n]) corresponds to a date 
-    in the Firm Period range. 
-    The result can be inserted into a SQL table later.
+    Transform the extracted parts into database-ready records: one dict per
+    part x Firm Period date. Kept for callers that need dicts; process_pdf
+    itself returns the columnar DIMatrix (see di_matrix.py).
     """
-
-    records = []
-
-    # Get firm start and end dates from header
-    start_date = header.get("Firm Start")
-    end_date = header.get("Firm End")
-
-    # Validate header dates (check if found in header)
-    if not start_date or not end_date:
-        print("⚠️ Missing Firm period, skipping date expansion")
-        return []
-
-    # --------------------------------------------
-    # 🔍 Step 1: Create a list of all dates in the firm period
-    # --------------------------------------------
-    # Example: 2025-10-01 → 2025-10-15
-    # datetime.timedelta(days=i) adds i days to start_date
-    # .date() converts to just date (without time)
-    # --------------------------------------------
-    date_range = [
-        (start_date + datetime.timedelta(days=i)).date()
-        for i in range((end_date - start_date).days + 1)
-    ]
-
-    # --------------------------------------------
-    # 🔍 Step 2: Loop through each part
-    # --------------------------------------------
-    for part in partdetails:
-        qty_values = part.get("qty_values", [])
-
-        # Loop through each date + index
-        for idx, current_date in enumerate(date_range):
-
-            # Match quantity by index position
-            # if there are fewer qty_values than dates, default to 0
-            qty = str(qty_values[idx]) if idx < len(qty_values) else "0"
-
-            # Build one complete record for this date & part
-            record = {
-                "PurchaseSchedule": header.get("Purchase Schedule No"),
-                "Date": current_date.strftime("%Y-%m-%d"),
-                "CustomerName": header.get("Customer Name"),
-                "CustomerCode": header.get("Customer Code"),
-                "PartDesc": part.get("part_desc"),   # ✅ FIXED
-                "PartNum": part.get("part_num"),     # ✅ FIXED
-                "Qty": qty,
-            }
-
-            records.append(record)
-
-    return records
+    return DIMatrix.from_parts(header, partdetails).to_records()
 
 # ==============================
-# MAIN : This step will change to be use by other files
+# LOW-MEMORY MODE
 # ==============================
-def process_pdf(pdf_path:str, out_dir="rows_out"):
-    all_partdetails = []
-    header = {}
+class MemoryBudgetExceeded(MemoryError):
+    pass
 
-    with pdfplumber.open(pdf_path) as pdf:
 
-        for page_num, page in enumerate(pdf.pages, start=1):
-            print(f"\n📄 Processing Page {page_num}")
+def current_rss_mb():
+    """Resident set size of this process in MB (psutil, else /proc)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2**20
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return 0.0
 
-            # Step 1: Header (first page only)
-            if page_num == 1:
-                header = extract_header(page, customer)
-                print("📄 Header Data:")
-                for k, v in header.items():
-                    print(f"{k}: {v}")
 
-            # Step 2: Extract part numbers
-            partdetails = extract_part(page, page_no=page_num)
+def release_page(*pages):
+    """Drop pdfplumber's per-page caches (chars, layout, text map)."""
+    for page in pages:
+        if page is not None:
+            page.close()
 
-            if not partdetails:
-                print(f"⚠️ No parts found on page {page_num}, skipping...")
-                continue
 
-            # Step 3: Crop qty region
-            cropped_page = crop_region(page)
+def check_rss_budget(rss_budget_mb, page_num):
+    """
+    Collect garbage when over budget; raise if that does not bring RSS back
+    under it, so a runaway DI fails fast instead of swapping the server.
+    """
+    rss = current_rss_mb()
+    if rss <= rss_budget_mb:
+        return rss
+    gc.collect()
+    rss = current_rss_mb()
+    if rss > rss_budget_mb:
+        raise MemoryBudgetExceeded(
+            f"RSS {rss:.0f} MB over budget {rss_budget_mb} MB after page {page_num}")
+    return rss
 
-            # Step 4: Crop rows & OCR columns
-            partdetails = crop_qty_rows(
-                cropped_page,
-                partdetails,
-                page_num=page_num,
-                out_dir=out_dir,
-                num_cols=16,
-                pad=3
-            )
+# ==============================
+# MAIN : This step will change to be use by other files
+# ==============================
+def process_pdf(pdf_path:str, out_dir="rows_out", low_memory=False, rss_budget_mb=None,
+                render_backend="pdfplumber", dpi=300, save_images=True,
+                adaptive=False, low_dpi=150, conf_threshold=OCR_CONF_THRESHOLD, montage=False,
+                preprocess=False, geometry_cache=True, forecast=False):
+    """
+    low_memory=True releases each page's caches and crops as soon as the page
+    is done, so memory stays flat however long the DI is.
+    rss_budget_mb (optional) raises MemoryBudgetExceeded once RSS stays above
+    it after a page.
+    render_backend="pdfium" rasterizes only the qty region, in grayscale, at
+    `dpi` (see pdf_render.py); "pdfplumber" is the original per-row render.
+    save_images=False skips the debug PNGs under out_dir.
+    adaptive=True (pdfium only) OCRs at `low_dpi` and re-reads untrusted
+    cells at `dpi`; the result then carries "ocr_stats".
+    montage=True runs one OCR call per page over all inked cells.
+    preprocess=True cleans the rendered image (binarize, strip ruling lines)
+    and tight-crops cells before OCR.
+    geometry_cache=False runs pdfplumber's table finder on every page instead
+    of reusing the customer template's layout (table_geometry.py).
+    forecast=True also reads the forecast half of every row in the same pass;
+    the result then carries a "forecast" DIMatrix (qty_type "forecast").
+    """
+    if render_backend not in ("pdfplumber", "pdfium"):
+        raise ValueError(f"Unknown render_backend: {render_backend}")
 
-            all_partdetails.extend(partdetails)
+    all_partdetails = []
+    header = {}
+    ocr_stats = {"cells": 0, "escalated": 0, "ocr_calls": 0}
+    qty_options = {"dpi": dpi, "save_images": save_images, "adaptive": adaptive, "low_dpi": low_dpi,
+                   "conf_threshold": conf_threshold, "montage": montage, "preprocess": preprocess,
+                   "forecast": forecast, "ocr_stats": ocr_stats}
+    pdfium_doc = open_document(pdf_path) if render_backend == "pdfium" else None
 
-    # Expand for database insertion
-    db_rows = expand_to_db_rows(header, all_partdetails)
+    # The native document is closed on every exit (OCR error, bad page, RSS budget)
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+
+            for page_num, page in enumerate(pdf.pages, start=1):
+                pdfium_page = pdfium_doc[page_num - 1] if pdfium_doc is not None else None
+                try:
+                    _process_page(page, page_num, header, all_partdetails, out_dir, low_memory,
+                                  geometry_cache, pdfium_page=pdfium_page, **qty_options)
+                finally:
+                    if low_memory:
+                        release_page(page)
+                    if pdfium_page is not None:
+                        pdfium_page.close()
+                if rss_budget_mb:
+                    rss = check_rss_budget(rss_budget_mb, page_num)
+                    print(f"🧠 RSS after page {page_num}: {rss:.0f} MB")
+    finally:
+        if pdfium_doc is not None:
+            pdfium_doc.close()
+
+    # Parts x days matrix for database insertion (matrix.to_records() gives
+    # the old per-cell dicts)
+    matrix = DIMatrix.from_parts(header, all_partdetails)
+    forecast_matrix = DIMatrix.from_parts(header, all_partdetails, qty_type="forecast") if forecast else None
+
+    if adaptive and ocr_stats["cells"]:
+        ocr_stats["escalation_rate"] = ocr_stats["escalated"] / ocr_stats["cells"]
+        print(f"🔎 Adaptive OCR: {ocr_stats['escalated']}/{ocr_stats['cells']} cells "
+              f"re-read at {dpi} DPI ({ocr_stats['escalation_rate']:.1%})")
+    if montage:
+        print(f"🧩 Montage OCR: {ocr_stats['ocr_calls']} tesseract call(s) for {ocr_stats['cells']} cells")
 
     # Return everything as structured data
     return {
         "header": header,
         "parts": all_partdetails,
-        "db_rows": db_rows,
+        "matrix": matrix,
+        "forecast": forecast_matrix,
+        "ocr_stats": ocr_stats,
     }
 
 
+def _process_page(page, page_num, header, all_partdetails, out_dir, low_memory=False,
+                  geometry_cache=True, **qty_options):
+    """One page of process_pdf: header (page 1), parts, qty OCR."""
+    print(f"\n📄 Processing Page {page_num}")
+
+    # Step 1: Header (first page only)
+    if page_num == 1:
+        header.update(extract_header(page, customer))
+        print("📄 Header Data:")
+        for k, v in header.items():
+            print(f"{k}: {v}")
 
-    
+    # Step 2: Extract part numbers (table layout cached per customer template)
+    customer_code = header.get("Customer Code") if geometry_cache else None
+    partdetails = extract_part(page, page_no=page_num, customer_code=customer_code)
+
+    if not partdetails:
+        print(f"⚠️ No parts found on page {page_num}, skipping...")
+        return
+
+    # Step 3: Crop qty region
+    cropped_page = crop_region(page)
+
+    # Step 4: Crop rows & OCR columns
+    try:
+        partdetails = crop_qty_rows(
+            cropped_page,
+            partdetails,
+            page_num=page_num,
+            out_dir=out_dir,
+            num_cols=16,
+            pad=3,
+            **qty_options
+        )
+    finally:
+        if low_memory:
+            release_page(cropped_page)
+
+    all_partdetails.extend(partdetails)
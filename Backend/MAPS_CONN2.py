@@ -1,13 +1,83 @@
-import pyodbc
+import os
+import re
+import sqlite3
+
+try:
+    import pyodbc
+except ImportError:  # only needed for the real MAPS server
+    pyodbc = None
+
+# ==============================
+# MAPS CONNECTION
+# ==============================
+# Defaults point at the production SQL Server. Override with environment
+# variables, e.g. for the local stand-in built by local_fixture.py:
+#
+#   MAPS_BACKEND=sqlite  MAPS_SQLITE_PATH=/tmp/maps.db
+#
+# or another SQL Server:
+#
+#   MAPS_SERVER=... MAPS_DATABASE=... MAPS_UID=... MAPS_PWD=... MAPS_DRIVER=...
+#   MAPS_CONN_STR=<full ODBC connection string>  (wins over the above)
+
+BACKEND = os.environ.get("MAPS_BACKEND", "mssql").lower()
+DEFAULT_SERVER = "10.0.100.15\\SQLEXPRESS"
+SQLITE_PATH = os.environ.get("MAPS_SQLITE_PATH", "maps_local.db")
+
+# Driver errors that mean "server unreachable / connection dropped"
+RETRYABLE_ERRORS = ()
+if pyodbc is not None:
+    RETRYABLE_ERRORS += (pyodbc.OperationalError, pyodbc.InterfaceError)
+
+# sqlite raises OperationalError for SQL bugs too (no such table, syntax
+# errors); only a busy / locked database is worth another attempt
+SQLITE_RETRYABLE_CODES = {5, 6}  # SQLITE_BUSY, SQLITE_LOCKED
+
+
+def is_retryable(error):
+    """True when a MAPS driver error is transient (see RETRYABLE_ERRORS)."""
+    if isinstance(error, sqlite3.OperationalError):
+        code = getattr(error, "sqlite_errorcode", None)  # Python 3.11+
+        if code is not None:
+            return (code & 0xFF) in SQLITE_RETRYABLE_CODES  # low byte = primary code
+        message = str(error).lower()
+        return "locked" in message or "busy" in message
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def _odbc_connection_string():
+    if os.environ.get("MAPS_CONN_STR"):
+        return os.environ["MAPS_CONN_STR"]
+    return (
+        f"DRIVER={{{os.environ.get('MAPS_DRIVER', 'SQL Server')}}};"
+        f"SERVER={os.environ.get('MAPS_SERVER', DEFAULT_SERVER)};"
+        f"DATABASE={os.environ.get('MAPS_DATABASE', 'avelon-yollink')};"
+        f"UID={os.environ.get('MAPS_UID', 'sa')};"
+        f"PWD={os.environ.get('MAPS_PWD', 'sa@123')};"
+    )
 
 
 def get_connection():
+    if BACKEND == "sqlite":
+        # Shared across the sync engine's reader threads
+        return sqlite3.connect(SQLITE_PATH, check_same_thread=False)
+
+    if pyodbc is None:
+        raise ImportError("pyodbc is required for MAPS_BACKEND=mssql")
     # Establishing the connection
-    connection = pyodbc.connect(
-            'DRIVER={SQL Server};'
-            'SERVER=10.0.100.15\\SQLEXPRESS;'
-            'DATABASE=avelon-yollink;'
-            'UID=sa;'
-            'PWD=sa@123;'
-        )
-    return connection
\ No newline at end of file
+    connection = pyodbc.connect(_odbc_connection_string())
+    return connection
+
+
+_CAST_DATE = re.compile(r"CAST\(\s*([\w.]+)\s+AS\s+DATE\s*\)", re.IGNORECASE)
+
+
+def adapt_sql(sql):
+    """
+    Translate the few T-SQL constructs the sync queries use for the active
+    backend. SQLite would turn CAST(x AS DATE) into a number, so it becomes
+    DATE(x) there. SQL Server queries pass through untouched.
+    """
+    if BACKEND == "sqlite":
+        return _CAST_DATE.sub(r"DATE(\1)", sql)
+    return sql
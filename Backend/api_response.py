@@ -0,0 +1,191 @@
+import gzip
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, request
+
+try:
+    import orjson  # fast path: dates/datetimes encoded natively in C
+except ImportError:
+    orjson = None
+    import json
+
+try:
+    import brotli  # optional, only used when the client accepts "br"
+except ImportError:
+    brotli = None
+
+# ==============================
+# CONFIGURATION
+# ==============================
+MIN_COMPRESS_BYTES = 1024   # smaller bodies are sent as-is
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5          # good ratio while staying cheap enough per request
+
+
+# ==============================
+# JSON ENCODING
+# ==============================
+def _default(value):
+    """Types neither encoder handles on its own."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "to_json"):   # DIMatrix and friends serialise themselves
+        return value.to_json()
+    if hasattr(value, "tolist"):    # numpy arrays / scalars
+        return value.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(payload):
+    """
+    Encode payload to UTF-8 JSON bytes (orjson when installed).
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def timed_dumps(payload):
+    """dumps() plus the time it took, in milliseconds."""
+    started = time.perf_counter()
+    body = dumps(payload)
+    return body, (time.perf_counter() - started) * 1000
+
+
+# ==============================
+# PER-ROUTE METRICS
+# ==============================
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def record_metrics(route, raw_bytes, sent_bytes, encode_ms):
+    with _metrics_lock:
+        m = _metrics.setdefault(route, {
+            "responses": 0, "raw_bytes": 0, "sent_bytes": 0,
+            "encode_ms_total": 0.0, "encode_ms_max": 0.0,
+        })
+        m["responses"] += 1
+        m["raw_bytes"] += raw_bytes
+        m["sent_bytes"] += sent_bytes
+        m["encode_ms_total"] += encode_ms
+        m["encode_ms_max"] = max(m["encode_ms_max"], encode_ms)
+
+
+def metrics_report():
+    """
+    Snapshot of payload size / encode time per route, with averages.
+    """
+    with _metrics_lock:
+        report = {}
+        for route, m in _metrics.items():
+            n = m["responses"] or 1
+            report[route] = {
+                **m,
+                "avg_raw_bytes": round(m["raw_bytes"] / n),
+                "avg_sent_bytes": round(m["sent_bytes"] / n),
+                "avg_encode_ms": round(m["encode_ms_total"] / n, 3),
+                "compression_ratio": round(m["sent_bytes"] / m["raw_bytes"], 3) if m["raw_bytes"] else None,
+            }
+        return report
+
+
+# ==============================
+# COMPRESSION
+# ==============================
+def negotiate_encoding():
+    """Pick 'br', 'gzip' or None from the request's Accept-Encoding."""
+    offered = ["br", "gzip"] if brotli is not None else ["gzip"]
+    return request.accept_encodings.best_match(offered)
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def _route_name():
+    return request.url_rule.rule if request.url_rule else request.path
+
+
+def encoded_response(body, status=200, encodings=None, encode_ms=0.0):
+    """
+    Build a Response from encoded JSON bytes, compressing above the threshold.
+    `encodings` (optional dict) memoises compressed variants, e.g. inside a
+    cache entry, so cache hits do not recompress.
+    """
+    encoding = negotiate_encoding() if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        if encodings is not None and encoding in encodings:
+            sent = encodings[encoding]
+        else:
+            sent = compress(body, encoding)
+            if encodings is not None:
+                encodings[encoding] = sent
+    else:
+        sent = body
+
+    response = Response(sent, status=status, mimetype="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+
+    record_metrics(_route_name(), len(body), len(sent), encode_ms)
+    return response
+
+
+def json_response(payload, status=200):
+    """
+    Drop-in replacement for jsonify(): fast encode + negotiated compression.
+    """
+    body, encode_ms = timed_dumps(payload)
+    return encoded_response(body, status=status, encode_ms=encode_ms)
+
+
+def streamed_response(chunks):
+    """
+    Stream an iterable of str/bytes JSON fragments, gzip-compressed on the fly
+    when the client accepts it. Metrics are recorded when the stream ends.
+    """
+    route = _route_name()
+    use_gzip = request.accept_encodings.best_match(["gzip"]) == "gzip"
+
+    def generate():
+        raw = sent = 0
+        encode_ms = 0.0
+        gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if use_gzip else None
+        try:
+            for chunk in chunks:
+                started = time.perf_counter()
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                raw += len(chunk)
+                if gz:
+                    chunk = gz.compress(chunk)
+                encode_ms += (time.perf_counter() - started) * 1000
+                if chunk:
+                    sent += len(chunk)
+                    yield chunk
+            if gz:
+                tail = gz.flush()
+                sent += len(tail)
+                yield tail
+        finally:
+            record_metrics(route, raw, sent, encode_ms)
+
+    response = Response(generate(), mimetype="application/json")
+    response.headers["Vary"] = "Accept-Encoding"
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
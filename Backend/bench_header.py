@@ -0,0 +1,73 @@
+import argparse
+import re
+import time
+
+import pdfplumber
+
+from DIExtract07 import customer, extract_header
+
+# ==============================
+# HEADER BENCH: whole page vs header band
+# ==============================
+# Times header parsing on every page of each DI, once the way it used to be
+# done (extract_text() of the whole page, one re.search per field, an `in`
+# scan per customer) and once with extract_header() (header band only, one
+# combined pattern). Pages hold tables of different sizes; the band time
+# should not follow the page's char count.
+#
+#   python bench_header.py DI.pdf DI_02.pdf --repeat 20
+
+
+def full_page_header(page, customer_lib):
+    """The previous extract_header(): whole-page text, a search per field."""
+    text = page.extract_text() or ""
+    found = {}
+    match = re.search(r"Purchase Schedule No\.?:\s*(\S+)", text, re.IGNORECASE)
+    if match:
+        found["schedule"] = match.group(1)
+    match = re.search(r"Firm Period\s*:\s*(.+)", text)
+    if match:
+        found["firm_period"] = match.group(1).strip()
+    match = re.search(r"Forecast\b[^\n]*?\b(\d{1,2})/(\d{1,2})-(\d{1,2})/(\d{1,2})\b", text)
+    if match:
+        found["forecast"] = match.groups()
+    for name in customer_lib:
+        if name in text:
+            found["customer"] = name
+            break
+    return found
+
+
+def timed(fn, page, repeat):
+    """
+    Best-of-repeat milliseconds. The page's objects are parsed once up front
+    (both ways pay that); its cached text layout is dropped every time.
+    """
+    page.objects
+    best = float("inf")
+    for _ in range(repeat):
+        page.get_textmap.cache_clear()
+        started = time.perf_counter()
+        fn(page, customer)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench(pdf_paths, repeat):
+    print(f"\n{'pdf':<20}{'page':>6}{'chars':>8}{'full page ms':>14}{'band ms':>10}")
+    for pdf_path in pdf_paths:
+        name = pdf_path.rsplit("/", 1)[-1]
+        with pdfplumber.open(pdf_path) as pdf:
+            for page_num, page in enumerate(pdf.pages, start=1):
+                chars = len(page.chars)
+                full_ms = timed(full_page_header, page, repeat)
+                band_ms = timed(extract_header, page, repeat)
+                print(f"{name:<20}{page_num:>6}{chars:>8}{full_ms:>14.2f}{band_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time DI header parsing: whole page vs header band")
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    bench(args.pdfs, args.repeat)
@@ -0,0 +1,98 @@
+import argparse
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from DIExtract07 import process_pdf
+
+# ==============================
+# OCR BENCH: fixed DPI vs adaptive vs montage
+# ==============================
+# Runs process_pdf on each DI once per mode (every cell at --dpi; adaptive:
+# --low-dpi first, low-confidence cells re-read at --dpi; montage: one OCR
+# call per page; montage+adaptive) and reports seconds per page, tesseract
+# calls, escalated cells and cell accuracy against a golden file
+# (DIMatrix.to_json() per PDF, keyed by file name). --preprocess runs every
+# mode on cleaned, tight-cropped cells (ocr_preprocess.py).
+#
+#   python bench_ocr.py DI1.pdf DI2.pdf --write-golden golden.json   # from the fixed run
+#   python bench_ocr.py DI1.pdf DI2.pdf --golden golden.json
+
+
+MODES = {
+    "fixed": {},
+    "adaptive": {"adaptive": True},
+    "montage": {"montage": True},
+    "montage+adaptive": {"montage": True, "adaptive": True},
+}
+
+
+def run(pdf_path, mode, dpi, low_dpi, conf_threshold, preprocess=False):
+    with tempfile.TemporaryDirectory() as out_dir:
+        started = time.perf_counter()
+        result = process_pdf(pdf_path, out_dir=out_dir, low_memory=True, render_backend="pdfium",
+                             dpi=dpi, save_images=False, low_dpi=low_dpi,
+                             conf_threshold=conf_threshold, preprocess=preprocess, **MODES[mode])
+        seconds = time.perf_counter() - started
+    return result, seconds
+
+
+def accuracy(matrix, golden):
+    """Share of golden cells read identically (missing parts count as wrong)."""
+    expected = {p["part_num"]: p["qty"] for p in golden["parts"]}
+    got = dict(zip(matrix.part_nums.tolist(), matrix.qty.tolist()))
+    total = matching = 0
+    for part_num, qty in expected.items():
+        total += len(qty)
+        if part_num in got:
+            matching += int(np.sum(np.asarray(got[part_num][:len(qty)]) == np.asarray(qty[:len(got[part_num])])))
+    return matching / total if total else 1.0
+
+
+def bench(pdf_paths, dpi, low_dpi, conf_threshold, golden=None, modes=tuple(MODES), preprocess=False):
+    rows = []
+    fixed_results = {}
+    for pdf_path in pdf_paths:
+        name = pdf_path.rsplit("/", 1)[-1]
+        for mode in modes:
+            result, seconds = run(pdf_path, mode, dpi, low_dpi, conf_threshold, preprocess)
+            pages = max(len({p["page"] for p in result["parts"]}), 1)
+            stats = result["ocr_stats"]
+            acc = accuracy(result["matrix"], golden[name]) if golden and name in golden else None
+            rows.append((name, mode, seconds / pages, stats.get("ocr_calls", 0) / pages,
+                         stats.get("escalated", 0), stats.get("cells", 0), acc))
+            if mode == "fixed":
+                fixed_results[name] = result["matrix"].to_json()
+
+    print(f"\n{'pdf':<28}{'mode':<18}{'s/page':>8}{'calls/page':>12}{'escalated':>12}{'accuracy':>10}")
+    for name, mode, per_page, calls, escalated, cells, acc in rows:
+        esc = f"{escalated}/{cells}" if MODES[mode].get("adaptive") else "-"
+        acc_str = f"{acc:.2%}" if acc is not None else "-"
+        print(f"{name:<28}{mode:<18}{per_page:>8.2f}{calls:>12.1f}{esc:>12}{acc_str:>10}")
+    return fixed_results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the OCR modes of process_pdf on DI PDFs")
+    parser.add_argument("pdfs", nargs="+")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--low-dpi", type=int, default=150)
+    parser.add_argument("--conf-threshold", type=float, default=80)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--preprocess", action="store_true", help="clean + tight-crop cells before OCR")
+    parser.add_argument("--golden", help="JSON {pdf name: DIMatrix.to_json()} to score against")
+    parser.add_argument("--write-golden", help="save the fixed-DPI results as a golden file")
+    args = parser.parse_args()
+
+    golden = None
+    if args.golden:
+        with open(args.golden) as f:
+            golden = json.load(f)
+    modes = args.modes if not args.write_golden or "fixed" in args.modes else ["fixed"] + args.modes
+    fixed = bench(args.pdfs, args.dpi, args.low_dpi, args.conf_threshold, golden, modes, args.preprocess)
+    if args.write_golden:
+        with open(args.write_golden, "w") as f:
+            json.dump(fixed, f, indent=2)
+        print(f"💾 Golden results written to {args.write_golden}")
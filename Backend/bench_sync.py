@@ -0,0 +1,100 @@
+import argparse
+import time
+
+import MAPS_CONN2 as Maps
+import local_fixture
+from chunked_sync import DEFAULT_CHUNK_SIZE
+from insert_data import insert_delivery_instructions
+from sync_engine import run_sync
+from product_daily_output import STOCK_SYNC
+from jtc_plan_data import PLAN_SYNC
+
+# ==============================
+# OFFLINE SYNC / INSERT BENCHMARK
+# ==============================
+# Runs the real sync jobs and insert path against the local stand-ins built
+# by local_fixture.py and prints throughput per scenario, e.g.
+#
+#   export MAPS_BACKEND=sqlite MAPS_SQLITE_PATH=/tmp/maps.db
+#   export YOLLINK_DB_HOST=localhost YOLLINK_DB_NAME=yollink_bench YOLLINK_FIXTURE_OK=1
+#   python bench_sync.py --jobs 200000 --stock 2000000
+
+
+def _check_local():
+    if Maps.BACKEND != "sqlite":
+        raise SystemExit("❌ Refusing to benchmark: set MAPS_BACKEND=sqlite first")
+    try:
+        local_fixture.check_local_yollink()
+    except RuntimeError as e:
+        raise SystemExit(f"❌ Refusing to benchmark: {e}")
+
+
+def _row(scenario, stats):
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return (scenario, stats["job"], "ok" if stats["ok"] else "FAILED", stats["rows"],
+            stats["new"] + stats["modified"], stats["seconds"], rate)
+
+
+def bench_sync(chunk_size):
+    """Every sync mode, in an order where each one has real work to do."""
+    results = []
+    scenarios = [
+        ("initial load", dict(full_reconcile=True), None),
+        ("idle incremental", dict(), None),
+        ("incremental after edits", dict(), local_fixture.touch_maps),
+        ("full reconcile", dict(full_reconcile=True), None),
+        ("full, sequential", dict(full_reconcile=True, concurrent=False), None),
+        ("full, streaming", dict(full_reconcile=True, streaming=True, chunk_size=chunk_size), None),
+    ]
+    for scenario, options, before in scenarios:
+        if before:
+            before()
+        for job in (STOCK_SYNC, PLAN_SYNC):
+            results.append(_row(scenario, run_sync(job, **options)))
+    return results
+
+
+def bench_insert(parts, days, repeats):
+    """insert_delivery_instructions() on one synthetic upload, replaced `repeats` times."""
+    db_rows = local_fixture.synthetic_db_rows(parts=parts, days=days)
+    results = []
+    for i in range(repeats):
+        started = time.perf_counter()
+        insert_delivery_instructions(db_rows, version=1)
+        seconds = time.perf_counter() - started
+        results.append((f"DI upload #{i + 1}", "delivery_instruction", "ok", len(db_rows),
+                        len(db_rows), seconds, len(db_rows) / seconds))
+    return results
+
+
+def print_report(results):
+    print()
+    print(f"{'scenario':<26}{'job':<22}{'':<8}{'rows':>12}{'changed':>10}{'seconds':>10}{'rows/s':>12}")
+    for scenario, job, outcome, rows, changed, seconds, rate in results:
+        print(f"{scenario:<26}{job:<22}{outcome:<8}{rows:>12,}{changed:>10,}{seconds:>10.2f}{rate:>12,.0f}")
+
+
+# ===========================================
+# RUN
+# ===========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark sync and insert throughput on local stand-ins")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--stock", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--delivery-rows", type=int, default=0, help="background rows in delivery_instruction")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--di-parts", type=int, default=200)
+    parser.add_argument("--di-days", type=int, default=90)
+    parser.add_argument("--di-repeats", type=int, default=3)
+    parser.add_argument("--reuse", action="store_true", help="keep the existing fixture data")
+    args = parser.parse_args()
+
+    _check_local()
+    if not args.reuse:
+        local_fixture.build_maps(jobs=args.jobs, stock=args.stock, products=args.products)
+        local_fixture.build_yollink(delivery_rows=args.delivery_rows)
+
+    results = bench_sync(args.chunk_size)
+    results += bench_insert(args.di_parts, args.di_days, args.di_repeats)
+    print_report(results)
@@ -0,0 +1,98 @@
+import io
+import time
+import pandas as pd
+
+# ==============================
+# BULK COPY + UPSERT (PostgreSQL)
+# ==============================
+# DataFrame columns -> CSV buffer -> COPY into a temp staging table ->
+# one INSERT ... ON CONFLICT DO UPDATE into the target. Replaces the
+# per-row cursor.execute() loops of the sync jobs.
+
+NULL_MARKER = "\\N"
+
+
+def _csv_ready(df):
+    """
+    Make a frame safe for COPY: integer columns that picked up NaN (and so
+    became float) go back to nullable Int64, otherwise '12.0' hits an
+    INTEGER column.
+    """
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_float_dtype(series):
+            values = series.dropna()
+            if len(values) and (values == values.round()).all():
+                df[col] = series.astype("Int64")
+    return df
+
+
+def copy_upsert(conn, df, table, key, columns=None, touch_column="updated_at"):
+    """
+    Insert-or-update every row of `df` into `table` in one statement.
+
+    df           : frame whose column names already match the target table
+    key          : conflict column (must carry a unique index), e.g. "stockid"
+    columns      : columns to load (default: all columns of df)
+    touch_column : set to NOW() on insert and on real changes (None to skip)
+
+    Rows whose values are unchanged are left alone. Does not commit.
+    Returns {"rows", "written", "seconds", "rows_per_sec"}.
+    """
+    columns = list(columns or df.columns)
+    if key not in columns:
+        raise ValueError(f"Key column '{key}' missing from bulk load columns")
+
+    started = time.perf_counter()
+    if df.empty:
+        return {"rows": 0, "written": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    cursor = conn.cursor()
+    staging = f"_stage_{table}"
+    col_list = ", ".join(columns)
+
+    # 1️⃣ Staging table with the target's column types, dropped at commit
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+        SELECT {col_list} FROM {table} WITH NO DATA
+    """)
+
+    # 2️⃣ COPY straight from an in-memory CSV buffer
+    buf = io.StringIO()
+    _csv_ready(df[columns]).to_csv(buf, index=False, header=False, na_rep=NULL_MARKER)
+    buf.seek(0)
+    cursor.copy_expert(
+        f"COPY {staging} ({col_list}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')",
+        buf,
+    )
+
+    # 3️⃣ Single upsert; DISTINCT ON guards against duplicate keys in the batch
+    insert_cols = columns + ([touch_column] if touch_column else [])
+    select_cols = col_list + (", NOW()" if touch_column else "")
+    value_cols = [c for c in columns if c != key]
+    set_clause = ", ".join(f"{c} = EXCLUDED.{c}" for c in value_cols)
+    if touch_column:
+        set_clause += f", {touch_column} = NOW()"
+    changed = " OR ".join(f"{table}.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in value_cols)
+
+    upsert = f"""
+        INSERT INTO {table} ({", ".join(insert_cols)})
+        SELECT DISTINCT ON ({key}) {select_cols}
+        FROM {staging}
+        ORDER BY {key}
+    """
+    if value_cols:
+        upsert += f" ON CONFLICT ({key}) DO UPDATE SET {set_clause} WHERE {changed}"
+    else:
+        upsert += f" ON CONFLICT ({key}) DO NOTHING"
+    cursor.execute(upsert)
+    written = cursor.rowcount
+    cursor.close()
+
+    seconds = time.perf_counter() - started
+    rows_per_sec = len(df) / seconds if seconds > 0 else float("inf")
+    print(f"🚚 Bulk upsert {table}: {len(df)} rows staged, {written} written "
+          f"in {seconds:.2f}s ({rows_per_sec:,.0f} rows/s)")
+    return {"rows": len(df), "written": written, "seconds": seconds, "rows_per_sec": rows_per_sec}
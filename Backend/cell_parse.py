@@ -0,0 +1,81 @@
+import re
+
+import numpy as np
+
+# ==============================
+# TABLE CELL PARSING (shared by the DIExtract variants)
+# ==============================
+# pdfplumber gives table cells as str / None; the DI table stacks two values
+# in one cell:
+#
+#   part column   "BODY,PIPE 1-1 SUB-COMP.\nB17-E461A-10-C"   name over number
+#   qty columns   "200\n800"                                  firm over forecast
+#
+# Functions here take a whole table column and return NumPy arrays (object
+# str / int64 / bool) in one pass over it: the common single-number cell
+# takes a str.isdecimal() fast path, the rest go through the patterns
+# compiled once below. No per-cell try/except and no pattern compiled on
+# the fly.
+
+PART_NUMBER_RE = re.compile(r"[A-Z0-9\-]+")
+QTY_LINE_RE = re.compile(r"^\d+$", re.MULTILINE)                      # a line that is a whole number
+FIRST_LINE_RE = re.compile(r"^[^\S\n]*(\S[^\n]*?)[^\S\n]*$", re.MULTILINE)  # first non-blank line, stripped
+
+
+def is_valid_part_number(value) -> bool:
+    """Check if string looks like a part number (e.g. B17-E461A-10-C)."""
+    return bool(value) and PART_NUMBER_RE.fullmatch(value.strip()) is not None
+
+
+def valid_part_numbers(cells):
+    """bool array: is_valid_part_number() of every cell."""
+    return np.fromiter(map(is_valid_part_number, cells), dtype=bool, count=len(cells))
+
+
+def split_part_column(cells):
+    """
+    Part column cells -> (names, numbers, paired), one entry per cell.
+    names / numbers are the stripped first / second line ('' when missing);
+    paired is True where the cell is exactly "name\\nnumber".
+    """
+    names = np.empty(len(cells), dtype=object)
+    numbers = np.empty(len(cells), dtype=object)
+    paired = np.zeros(len(cells), dtype=bool)
+    for i, text in enumerate(cells):
+        name, sep, rest = (text or "").partition("\n")
+        number, more, _ = rest.partition("\n")
+        names[i], numbers[i], paired[i] = name.strip(), number.strip(), bool(sep) and not more
+    return names, numbers, paired
+
+
+def _stacked_qty(text):
+    if not text:
+        return 0
+    if text.isdecimal():
+        return int(text)
+    return sum(map(int, QTY_LINE_RE.findall(text)))
+
+
+def stacked_qty_column(cells):
+    """
+    Qty column cells -> int64 array: the sum of the cell's whole-number lines
+    ("200\\n800" -> 1000). Empty cells and cells without a number are 0.
+    """
+    return np.fromiter(map(_stacked_qty, cells), dtype=np.int64, count=len(cells))
+
+
+def _first_line_qty(text):
+    if not text:
+        return 0
+    if text.isdecimal():
+        return int(text)
+    line = FIRST_LINE_RE.search(text)
+    return int(line.group(1)) if line and line.group(1).isdecimal() else 0
+
+
+def first_line_qty_column(cells):
+    """
+    Qty column cells -> int64 array of the first non-blank line of each cell
+    (the firm value of a stacked cell); 0 when that line is not a number.
+    """
+    return np.fromiter(map(_first_line_qty, cells), dtype=np.int64, count=len(cells))
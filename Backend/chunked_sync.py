@@ -0,0 +1,63 @@
+import pandas as pd
+
+# ==============================
+# CHUNKED SOURCE READS
+# ==============================
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def read_sql_chunks(conn, sql, params=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield DataFrames of at most `chunk_size` rows from one query.
+    Uses cursor.fetchmany() with a matching arraysize (pyodbc fetches that
+    many rows per network round trip), so only one chunk is ever held in
+    Python memory.
+    """
+    cursor = conn.cursor()
+    cursor.arraysize = chunk_size
+    try:
+        if params:
+            cursor.execute(sql, params)
+        else:
+            cursor.execute(sql)
+        columns = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+    finally:
+        cursor.close()
+
+
+# ==============================
+# CHUNK vs TARGET SNAPSHOT
+# ==============================
+def split_changes(chunk, snapshot, key, compare):
+    """
+    Compare one source chunk with a key-indexed snapshot of the target.
+
+    chunk    : source rows, source column names
+    snapshot : target rows indexed by unique key, holding only the compared
+               columns; built once and passed unchanged to every chunk
+    compare  : {source column: target column}
+
+    Returns (new_rows, modified_rows), both slices of `chunk`.
+    """
+    found = chunk[key].isin(snapshot.index)
+    new_rows = chunk[~found]
+
+    existing = chunk[found]
+    if existing.empty:
+        return new_rows, existing
+
+    target = snapshot.loc[existing[key].values]
+    changed = pd.Series(False, index=existing.index)
+    for source_col, target_col in compare.items():
+        left = existing[source_col].values
+        right = target[target_col].values
+        # NaN/None on both sides counts as equal
+        both_null = pd.isna(left) & pd.isna(right)
+        changed |= (left != right) & ~both_null
+
+    return new_rows, existing[changed.values]
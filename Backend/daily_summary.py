@@ -0,0 +1,100 @@
+import argparse
+from y_data import get_connection
+
+# ==============================
+# delivery_daily_summary MAINTENANCE
+# ==============================
+# One row per (version, date_commit) holding the same figures the calendar
+# used to compute on every page view, over firm quantities only (forecast
+# rows, qty_type = 'forecast', are not commitments):
+#   total_qty   = SUM(quantity)
+#   total_parts = COUNT(DISTINCT customer_part_num)
+# COUNT(DISTINCT) cannot be patched with +/- deltas, so writers recompute the
+# affected (version, date) keys from delivery_instruction inside their own
+# transaction instead.
+
+def refresh_daily_summary(cursor, version, dates):
+    """
+    Recompute summary rows for one version and the given dates.
+    Must be called with the writer's cursor BEFORE its commit, so the summary
+    and delivery_instruction change atomically.
+    """
+    dates = sorted({str(d) for d in dates if d})
+    if not dates:
+        return 0
+
+    cursor.execute("""
+        DELETE FROM delivery_daily_summary
+        WHERE version = %s AND date_commit = ANY(%s::date[])
+    """, (version, dates))
+
+    cursor.execute("""
+        INSERT INTO delivery_daily_summary
+            (version, date_commit, total_qty, total_parts, updated_at)
+        SELECT version,
+               date_commit,
+               COALESCE(SUM(quantity), 0),
+               COUNT(DISTINCT customer_part_num),
+               NOW()
+        FROM delivery_instruction
+        WHERE version = %s AND date_commit = ANY(%s::date[]) AND qty_type = 'firm'
+        GROUP BY version, date_commit
+    """, (version, dates))
+
+    print(f"📅 Daily summary refreshed: version {version}, {len(dates)} date(s)")
+    return len(dates)
+
+
+def rebuild_daily_summary(version=None):
+    """
+    Drop and recompute the summary from delivery_instruction.
+    Use after manual SQL edits or anything else that bypassed the writers.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        params = []
+        where = ""
+        if version is not None:
+            where = "WHERE version = %s"
+            params.append(version)
+        firm_where = f"{where} AND qty_type = 'firm'" if where else "WHERE qty_type = 'firm'"
+
+        cursor.execute(f"DELETE FROM delivery_daily_summary {where}", params)
+        cursor.execute(f"""
+            INSERT INTO delivery_daily_summary
+                (version, date_commit, total_qty, total_parts, updated_at)
+            SELECT version,
+                   date_commit,
+                   COALESCE(SUM(quantity), 0),
+                   COUNT(DISTINCT customer_part_num),
+                   NOW()
+            FROM delivery_instruction
+            {firm_where}
+            GROUP BY version, date_commit
+        """, params)
+        rebuilt = cursor.rowcount
+
+        conn.commit()
+        scope = f"version {version}" if version is not None else "all versions"
+        print(f"✅ Daily summary rebuilt for {scope}: {rebuilt} rows")
+        return rebuilt
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Daily summary rebuild failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# ==============================
+# REBUILD COMMAND
+# ==============================
+#   python daily_summary.py              -> rebuild everything
+#   python daily_summary.py --version 2  -> rebuild one version only
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild delivery_daily_summary")
+    parser.add_argument("--version", type=int, default=None)
+    args = parser.parse_args()
+    rebuild_daily_summary(args.version)
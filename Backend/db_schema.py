@@ -0,0 +1,127 @@
+from y_data import get_connection
+
+# ==============================
+# SCHEMA OBJECTS (PostgreSQL)
+# ==============================
+# Every statement is idempotent so this file can be re-run after each deploy:
+#   python db_schema.py
+SCHEMA_STATEMENTS = [
+    # Pre-aggregated calendar totals, maintained by insert_data / manual_insert
+    """
+    CREATE TABLE IF NOT EXISTS delivery_daily_summary (
+        version      INTEGER   NOT NULL,
+        date_commit  DATE      NOT NULL,
+        total_qty    BIGINT    NOT NULL DEFAULT 0,
+        total_parts  INTEGER   NOT NULL DEFAULT 0,
+        updated_at   TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (version, date_commit)
+    )
+    """,
+    # Firm (Firm Period) vs forecast quantities of a DI row, see di_matrix.py;
+    # rows written before the column existed are firm
+    """
+    ALTER TABLE delivery_instruction
+        ADD COLUMN IF NOT EXISTS qty_type TEXT NOT NULL DEFAULT 'firm'
+    """,
+    # Lets the summary refresh find the rows of one (version, date) quickly
+    """
+    CREATE INDEX IF NOT EXISTS ix_delivery_instruction_version_date
+        ON delivery_instruction (version, date_commit)
+    """,
+    # Covers /api/version-diff (firm rows of both versions of one PO in a single
+    # index range) and the per-qty_type delete of a DI upload; replaces the
+    # index without qty_type, which left the firm filter to the heap
+    "DROP INDEX IF EXISTS ix_delivery_instruction_ps_version",
+    """
+    CREATE INDEX IF NOT EXISTS ix_delivery_instruction_ps_version_type
+        ON delivery_instruction (purchase_schedule, version, qty_type, customer_part_num, date_commit)
+        INCLUDE (quantity)
+    """,
+    # High-water marks of the MAPS -> Yollink syncs, see sync_watermark.py
+    """
+    CREATE TABLE IF NOT EXISTS sync_watermark (
+        job_name         TEXT PRIMARY KEY,
+        last_value       BIGINT,
+        last_success_at  TIMESTAMP,
+        last_full_at     TIMESTAMP
+    )
+    """,
+    # 64-bit fingerprint of all synced columns, see row_digest.py
+    "ALTER TABLE yollink_output ADD COLUMN IF NOT EXISTS row_digest BIGINT",
+    "ALTER TABLE yollink_orders ADD COLUMN IF NOT EXISTS row_digest BIGINT",
+    # sync_engine upserts ON CONFLICT (key), which needs a unique index
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_yollink_orders_job_id ON yollink_orders (job_id)",
+    # /api/coverage reads one month of plans as an index-only range scan
+    """
+    CREATE INDEX IF NOT EXISTS ix_yollink_orders_desiredate
+        ON yollink_orders (job_desiredate) INCLUDE (custpartnumber, job_quantity)
+    """,
+    # Projected on-hand per (version, part, day), see stock_netting.py
+    """
+    CREATE TABLE IF NOT EXISTS stock_netting (
+        version   INTEGER NOT NULL,
+        part      TEXT    NOT NULL,
+        day       DATE    NOT NULL,
+        demand    BIGINT  NOT NULL DEFAULT 0,
+        receipts  BIGINT  NOT NULL DEFAULT 0,
+        on_hand   BIGINT  NOT NULL DEFAULT 0,
+        PRIMARY KEY (version, day, part)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stock_netting_refresh (
+        version       INTEGER   NOT NULL,
+        month_start   DATE      NOT NULL,
+        opening_days  INTEGER   NOT NULL,
+        refreshed_at  TIMESTAMP NOT NULL,
+        PRIMARY KEY (version, month_start)
+    )
+    """,
+    # One row per sync attempt (CLI or sync_daemon.py), exposed at /api/sync-runs
+    """
+    CREATE TABLE IF NOT EXISTS sync_run_history (
+        id             SERIAL PRIMARY KEY,
+        job_name       TEXT      NOT NULL,
+        started_at     TIMESTAMP NOT NULL,
+        finished_at    TIMESTAMP NOT NULL,
+        duration_s     DOUBLE PRECISION,
+        outcome        TEXT      NOT NULL,   -- ok / failed / skipped
+        mode           TEXT,
+        attempt        INTEGER   NOT NULL DEFAULT 1,
+        rows_source    INTEGER,
+        rows_new       INTEGER,
+        rows_modified  INTEGER,
+        rows_written   INTEGER,
+        phases         JSONB,
+        error          TEXT
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_sync_run_history_job_started
+        ON sync_run_history (job_name, started_at DESC)
+    """,
+]
+
+
+def apply_schema():
+    """
+    Create missing tables / indexes used by the API and the sync jobs.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        for statement in SCHEMA_STATEMENTS:
+            cursor.execute(statement)
+        conn.commit()
+        print(f"✅ Schema up to date ({len(SCHEMA_STATEMENTS)} statements applied)")
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Failed to apply schema: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    apply_schema()
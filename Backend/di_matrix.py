@@ -0,0 +1,178 @@
+import datetime
+import io
+import sys
+
+import numpy as np
+import pandas as pd
+
+# ==============================
+# COLUMNAR DI RESULT
+# ==============================
+# One extracted DI as arrays instead of one dict per part x date:
+#
+#   dates       datetime64[D] vector, the Firm Period       (days,)
+#   part_nums   interned part number strings                (parts,)
+#   part_descs  interned part description strings           (parts,)
+#   qty         int32 quantities                            (parts, days)
+#
+# qty_type says which half of the DI rows it holds: "firm" (Firm Period,
+# top half) or "forecast" (the forecast dates, bottom half). Both go to
+# delivery_instruction, told apart by its qty_type column; aggregates read
+# firm only.
+#
+# Dict rows / JSON are only produced on request at the API boundary
+# (to_records / to_json); insert_data.py COPYs straight from the arrays.
+
+DB_COLUMNS = [
+    "purchase_schedule", "date_commit", "customer_name", "customer_code",
+    "customer_part_desc", "customer_part_num", "quantity", "created_at", "version", "qty_type",
+]
+
+# qty_type -> (header period start, header period end, partdetails values key)
+QTY_TYPES = {
+    "firm": ("Firm Start", "Firm End", "qty_values"),
+    "forecast": ("Forecast Start", "Forecast End", "forecast_values"),
+}
+
+
+def _intern(values):
+    return np.array([sys.intern(str(v)) if v is not None else None for v in values], dtype=object)
+
+
+def parse_qty(text):
+    """OCR cell text -> int; blank / no digits = 0."""
+    digits = "".join(ch for ch in str(text) if ch.isdigit())
+    return int(digits) if digits else 0
+
+
+class DIMatrix:
+    """
+    Parts x days quantity matrix of one delivery instruction plus its header.
+    """
+
+    def __init__(self, header, dates, part_nums, part_descs, qty, qty_type="firm"):
+        self.qty_type = qty_type
+        self.purchase_schedule = header.get("Purchase Schedule No")
+        self.customer_name = header.get("Customer Name")
+        self.customer_code = header.get("Customer Code")
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.part_nums = _intern(part_nums)
+        self.part_descs = _intern(part_descs)
+        self.qty = np.asarray(qty, dtype=np.int32).reshape(len(self.part_nums), len(self.dates))
+        self._date_strings = None
+
+    @classmethod
+    def from_parts(cls, header, partdetails, qty_type="firm"):
+        """
+        Build from extract_part / crop_qty_rows output. Quantity n of a part
+        belongs to day n of the Firm (or Forecast) period; missing ones are 0,
+        extra ones are dropped.
+        """
+        start_key, end_key, values_key = QTY_TYPES[qty_type]
+        start, end = header.get(start_key), header.get(end_key)
+        if not start or not end:
+            print(f"⚠️ Missing {qty_type.capitalize()} period, skipping date expansion")
+            dates = np.array([], dtype="datetime64[D]")
+        else:
+            dates = np.arange(np.datetime64(start.date()), np.datetime64(end.date()) + 1)
+
+        qty = np.zeros((len(partdetails), len(dates)), dtype=np.int32)
+        for row, part in enumerate(partdetails):
+            values = part.get(values_key)
+            if values is None:
+                continue
+            values = np.asarray([parse_qty(v) for v in values] if len(values) and isinstance(values[0], str)
+                                else values, dtype=np.int32)[:len(dates)]
+            qty[row, :len(values)] = values
+
+        return cls(
+            header,
+            dates,
+            [p.get("part_num") for p in partdetails],
+            [p.get("part_desc") for p in partdetails],
+            qty,
+            qty_type,
+        )
+
+    # ------------------------------
+    # Shape / summaries
+    # ------------------------------
+    def __len__(self):
+        """Number of (part, date) cells = rows the DB gets."""
+        return self.qty.size
+
+    @property
+    def date_strings(self):
+        """'YYYY-MM-DD' per day, formatted once for the whole vector."""
+        if self._date_strings is None:
+            self._date_strings = np.datetime_as_string(self.dates, unit="D").astype(object)
+        return self._date_strings
+
+    def date_list(self):
+        """Days as datetime.date objects."""
+        return self.dates.astype(datetime.date).tolist()
+
+    def totals_by_part(self):
+        return dict(zip(self.part_nums.tolist(), self.qty.sum(axis=1, dtype=np.int64).tolist()))
+
+    # ------------------------------
+    # API boundary
+    # ------------------------------
+    def iter_records(self):
+        """Lazily yield the legacy per-cell dicts (same keys as expand_to_db_rows)."""
+        date_strings = self.date_strings
+        for row, (part_num, part_desc) in enumerate(zip(self.part_nums, self.part_descs)):
+            for col, qty in enumerate(self.qty[row].tolist()):
+                yield {
+                    "PurchaseSchedule": self.purchase_schedule,
+                    "Date": date_strings[col],
+                    "CustomerName": self.customer_name,
+                    "CustomerCode": self.customer_code,
+                    "PartDesc": part_desc,
+                    "PartNum": part_num,
+                    "Qty": qty,
+                    "QtyType": self.qty_type,
+                }
+
+    def to_records(self):
+        return list(self.iter_records())
+
+    def to_json(self):
+        """Compact columnar JSON shape: one quantity list per part."""
+        return {
+            "purchase_schedule": self.purchase_schedule,
+            "customer_name": self.customer_name,
+            "customer_code": self.customer_code,
+            "qty_type": self.qty_type,
+            "dates": self.date_strings.tolist(),
+            "parts": [
+                {"part_num": num, "part_desc": desc, "qty": qty}
+                for num, desc, qty in zip(self.part_nums.tolist(), self.part_descs.tolist(), self.qty.tolist())
+            ],
+        }
+
+    # ------------------------------
+    # Bulk DB writer
+    # ------------------------------
+    def to_frame(self, version, created_at):
+        """delivery_instruction-shaped frame (DB_COLUMNS), one row per cell."""
+        n_parts, n_days = self.qty.shape
+        return pd.DataFrame({
+            "purchase_schedule": self.purchase_schedule,
+            "date_commit": np.tile(self.date_strings, n_parts),
+            "customer_name": self.customer_name,
+            "customer_code": self.customer_code,
+            "customer_part_desc": np.repeat(self.part_descs, n_days),
+            "customer_part_num": np.repeat(self.part_nums, n_days),
+            "quantity": self.qty.ravel(),
+            "created_at": created_at,
+            "version": version,
+            "qty_type": self.qty_type,
+        }, columns=DB_COLUMNS)
+
+    def to_copy_buffer(self, version, created_at):
+        """CSV buffer ready for COPY delivery_instruction (DB_COLUMNS) FROM STDIN."""
+        buf = io.StringIO()
+        self.to_frame(version, created_at).to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        return buf
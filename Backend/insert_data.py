@@ -1,11 +1,13 @@
 from y_data import get_connection  # ✅ use your existing DB connector
 from psycopg2.extras import execute_values
 from datetime import datetime
+from daily_summary import refresh_daily_summary
+from di_matrix import DIMatrix, DB_COLUMNS
 
 # ============================================
 # INSERT INTO delivery_instruction
 # ============================================
-def insert_delivery_instructions(db_rows, version):
+def insert_delivery_instructions(db_rows, version, forecast=None):
     """
     Inserts multiple delivery instruction rows into the database.
 
@@ -17,12 +19,24 @@ def insert_delivery_instructions(db_rows, version):
             "CustomerCode": "46829-P",
             "PartDesc": "CAM, SHAFT 1",
             "PartNum": "10C-F5351-00",
-            "Qty": 200
+            "Qty": 200,
+            "QtyType": "firm"        # optional, "firm" when missing
         }
+
+    db_rows may also be a DIMatrix (what process_pdf returns); it is COPYed
+    straight from its arrays without building per-row dicts.
+    forecast (optional DIMatrix of qty_type "forecast") replaces the PO's
+    forecast rows of this version in the same transaction.
+
+    Returns the set of dates whose rows changed (deleted or inserted), so
+    callers can invalidate caches for every touched month; empty when
+    nothing was committed.
     """
     if not db_rows:
         print("⚠️ No rows to insert.")
-        return
+        return set()
+
+    affected_dates = set()
 
     conn = None
     try:
@@ -30,56 +44,83 @@ def insert_delivery_instructions(db_rows, version):
         print("🧩 Connected to DB successfully.")
         cursor = conn.cursor()
 
+        is_matrix = isinstance(db_rows, DIMatrix)
+
          # Get PO number (all rows share same one)
-        purchase_schedule_no = db_rows[0].get("PurchaseSchedule")
+        purchase_schedule_no = db_rows.purchase_schedule if is_matrix else db_rows[0].get("PurchaseSchedule")
 
-        # 1️⃣ Delete existing rows with same PurchaseSchedule + version
+        # 1️⃣ Delete existing rows with same PurchaseSchedule + version (only the
+        # quantity types being replaced; manually entered forecasts stay otherwise)
+        qty_types = ["firm", "forecast"] if forecast is not None else ["firm"]
         cursor.execute("""
             DELETE FROM delivery_instruction
-            WHERE purchase_schedule = %s AND version = %s
-        """, (purchase_schedule_no, version))
-        print(f"🧹 Deleted old version {version} for PO {purchase_schedule_no}")
-
-        query = """
-        INSERT INTO delivery_instruction
-        (purchase_schedule, date_commit, customer_name, customer_code,
-         customer_part_desc, customer_part_num, quantity, created_at, version)
-        VALUES %s;
-        """
-
-        values = [
-            (
-                row.get("PurchaseSchedule"),
-                row.get("Date"),
-                row.get("CustomerName"),
-                row.get("CustomerCode"),
-                row.get("PartDesc"),
-                row.get("PartNum"),
-                row.get("Qty"),
-                datetime.now(),
-                version
-            )
-            for row in db_rows
-        ]
-        print("🧠 Prepared to insert rows:", len(values))
-        print(values[:3])  # show first few rows
-
-        try:
-            execute_values(cursor, query, values)
-            print("✅ execute_values ran successfully.")
-        except Exception as inner_e:
-            print("🚨 execute_values failed:", inner_e)
+            WHERE purchase_schedule = %s AND version = %s AND qty_type = ANY(%s)
+            RETURNING date_commit
+        """, (purchase_schedule_no, version, qty_types))
+        affected_dates = {r[0] for r in cursor.fetchall()}
+        print(f"🧹 Deleted old version {version} for PO {purchase_schedule_no} ({', '.join(qty_types)})")
+
+        if is_matrix:
+            created_at = datetime.now()
+            for matrix in (db_rows, forecast):
+                if matrix is None or not len(matrix):
+                    continue
+                cursor.copy_expert(
+                    f"COPY delivery_instruction ({', '.join(DB_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                    matrix.to_copy_buffer(version, created_at),
+                )
+                print(f"✅ COPY ran successfully ({matrix.qty_type}: "
+                      f"{len(matrix.part_nums)} parts x {len(matrix.dates)} days).")
+            new_dates = db_rows.date_list() + (forecast.date_list() if forecast is not None else [])
+        else:
+            query = """
+            INSERT INTO delivery_instruction
+            (purchase_schedule, date_commit, customer_name, customer_code,
+             customer_part_desc, customer_part_num, quantity, created_at, version, qty_type)
+            VALUES %s;
+            """
+
+            values = [
+                (
+                    row.get("PurchaseSchedule"),
+                    row.get("Date"),
+                    row.get("CustomerName"),
+                    row.get("CustomerCode"),
+                    row.get("PartDesc"),
+                    row.get("PartNum"),
+                    row.get("Qty"),
+                    datetime.now(),
+                    version,
+                    row.get("QtyType", "firm"),
+                )
+                for row in db_rows
+            ]
+            print("🧠 Prepared to insert rows:", len(values))
+            print(values[:3])  # show first few rows
+
+            try:
+                execute_values(cursor, query, values)
+                print("✅ execute_values ran successfully.")
+            except Exception as inner_e:
+                print("🚨 execute_values failed:", inner_e)
+            new_dates = [row.get("Date") for row in db_rows]
+
+        # 2️⃣ Keep calendar summary in step (same transaction)
+        affected_dates.update(new_dates)
+        refresh_daily_summary(cursor, version, affected_dates)
 
         conn.commit()
         print("🧾 Commit done at", datetime.now())
 
-        print(f"✅ Successfully inserted {len(values)} delivery rows.")
+        print(f"✅ Successfully inserted {len(db_rows)} delivery rows.")
 
     except Exception as e:
         print(f"❌ Error inserting delivery data: {e}")
+        affected_dates = set()
         if conn:
             conn.rollback()
     finally:
         if conn:
             cursor.close()
             conn.close()
+    return affected_dates
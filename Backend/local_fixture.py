@@ -0,0 +1,351 @@
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import MAPS_CONN2 as Maps
+import y_data as Yollink
+from db_schema import apply_schema
+
+# ==============================
+# LOCAL STAND-IN DATABASES
+# ==============================
+# Builds throw-away copies of the tables the sync jobs and insert paths touch,
+# filled with synthetic rows, so they can be run and timed offline:
+#
+#   MAPS    -> SQLite file        (MAPS_BACKEND=sqlite MAPS_SQLITE_PATH=...)
+#   Yollink -> local PostgreSQL   (YOLLINK_DB_HOST / _NAME / _USER / _PORT ...)
+#
+# Only the columns the queries use are created. NEVER point this at the
+# production servers: build_* drops and recreates the tables. The Yollink
+# side refuses to connect unless YOLLINK_FIXTURE_OK=1 is set and the host is
+# not one of PRODUCTION_HOSTS.
+
+PRODUCTION_HOSTS = {"10.0.100.14", "10.0.100.15"}
+FIXTURE_OPT_IN = "YOLLINK_FIXTURE_OK"
+
+BATCH_ROWS = 100000
+START_DATE = date(2025, 1, 1)
+DATE_SPAN_DAYS = 365
+
+MAPS_TABLES = {
+    "Product": "Id INTEGER PRIMARY KEY, PartNumber TEXT, Name TEXT, Field1 TEXT, IsFinal INTEGER",
+    "CustomerOrder": "Id INTEGER PRIMARY KEY, PONumber TEXT, OrderNumber TEXT, Field1 TEXT",
+    "CustomerOrderItem": "Id INTEGER PRIMARY KEY, CustomerOrderId INTEGER",
+    "job": "Id INTEGER PRIMARY KEY, OrderNumber TEXT, DesireDate TEXT, Quantity INTEGER, "
+           "ProductId INTEGER, COItemId INTEGER",
+    "task": "Id INTEGER PRIMARY KEY, JobId INTEGER",
+    "LotCompletion": "Id INTEGER PRIMARY KEY, TaskId INTEGER",
+    "stock": "Id INTEGER PRIMARY KEY, Type INTEGER, LotCompletionId INTEGER, ProductId INTEGER, "
+             "Quantity REAL, DateCreated TEXT",
+}
+
+# Pre-existing production tables (the rest comes from db_schema.py)
+YOLLINK_TABLES = [
+    """
+    CREATE TABLE yollink_output (
+        stockid         INTEGER PRIMARY KEY,
+        datetransaction DATE,
+        partnumber      TEXT,
+        partdesc        TEXT,
+        custpartnumber  TEXT,
+        stockin         NUMERIC,
+        job_ordernum    TEXT,
+        co_ordernum     TEXT,
+        customerponum   TEXT,
+        updated_at      TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE yollink_orders (
+        job_id          INTEGER,
+        job_ordernumber TEXT,
+        job_desiredate  DATE,
+        job_quantity    INTEGER,
+        in_partnumber   TEXT,
+        in_partdesc     TEXT,
+        custpartnumber  TEXT,
+        custponumber    TEXT,
+        updated_at      TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE delivery_instruction (
+        id                 SERIAL PRIMARY KEY,
+        purchase_schedule  BIGINT,
+        date_commit        DATE,
+        customer_name      TEXT,
+        customer_code      TEXT,
+        customer_part_desc TEXT,
+        customer_part_num  TEXT,
+        quantity           INTEGER,
+        created_at         TIMESTAMP,
+        version            INTEGER
+    )
+    """,
+]
+
+
+# ==============================
+# SYNTHETIC ROWS
+# ==============================
+def _day(rng):
+    return START_DATE + timedelta(days=rng.randrange(DATE_SPAN_DAYS))
+
+
+def _insert_batched(conn, table, rows, n_columns):
+    """executemany in BATCH_ROWS slices from a row generator; returns row count."""
+    sql = f"INSERT INTO {table} VALUES ({', '.join('?' * n_columns)})"
+    cursor = conn.cursor()
+    total, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_ROWS:
+            cursor.executemany(sql, batch)
+            conn.commit()
+            total += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        conn.commit()
+        total += len(batch)
+    cursor.close()
+    return total
+
+
+def product_rows(n, rng):
+    for i in range(1, n + 1):
+        yield (i, f"P{i:06d}", f"PART {i}", f"{i % 999:03d}-F{i:04d}-00", int(rng.random() < 0.8))
+
+
+def order_rows(n, rng):
+    for i in range(1, n + 1):
+        status = "Confirm Order" if rng.random() < 0.9 else "Quotation"
+        yield (i, f"{400000000 + i}", f"CO{i:07d}", status)
+
+
+def job_rows(n, products, orders, rng, start_id=1):
+    """job + its CustomerOrderItem and task, sharing the job Id."""
+    for i in range(start_id, start_id + n):
+        co_item = i if rng.random() < 0.9 else None
+        yield (
+            (i, f"J{i:08d}", _day(rng).isoformat(), rng.randrange(10, 5000, 10),
+             rng.randrange(1, products + 1), co_item),
+            (i, rng.randrange(1, orders + 1)),
+            (i, i),
+        )
+
+
+def stock_rows(n, jobs, products, rng, start_id=1):
+    """stock + its LotCompletion, sharing the stock Id."""
+    for i in range(start_id, start_id + n):
+        created = datetime.combine(_day(rng), datetime.min.time()) + timedelta(minutes=rng.randrange(1440))
+        yield (
+            (i, 0 if rng.random() < 0.95 else 1, i, rng.randrange(1, products + 1),
+             float(rng.randrange(1, 500)), created.strftime("%Y-%m-%d %H:%M:%S")),
+            (i, rng.randrange(1, jobs + 1)),
+        )
+
+
+def _insert_linked(conn, total, make_rows, tables, start_id=1):
+    """
+    Insert `total` rows of a generator that yields one tuple per table
+    (e.g. job + its CustomerOrderItem + task), BATCH_ROWS at a time so
+    millions of rows never sit in memory at once.
+    """
+    done = 0
+    while done < total:
+        n = min(BATCH_ROWS, total - done)
+        batch = list(make_rows(n, start_id + done))
+        for index, (table, n_columns) in enumerate(tables):
+            _insert_batched(conn, table, (row[index] for row in batch), n_columns)
+        done += n
+        print(f"🧪 MAPS {tables[0][0]} rows: {done:,}/{total:,}")
+
+
+# ==============================
+# MAPS (SQLite)
+# ==============================
+def build_maps(jobs=100000, stock=1000000, products=2000, seed=7):
+    """
+    (Re)create the MAPS stand-in at MAPS_SQLITE_PATH. jobs/stock are row
+    counts; orders are one per 20 jobs.
+    """
+    if Maps.BACKEND != "sqlite":
+        raise RuntimeError("Set MAPS_BACKEND=sqlite before building the local MAPS fixture")
+
+    rng = random.Random(seed)
+    orders = max(jobs // 20, 1)
+    started = time.perf_counter()
+
+    conn = Maps.get_connection()
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for table, columns in MAPS_TABLES.items():
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(f"CREATE TABLE {table} ({columns})")
+
+        _insert_batched(conn, "Product", product_rows(products, rng), 5)
+        _insert_batched(conn, "CustomerOrder", order_rows(orders, rng), 4)
+
+        _insert_linked(conn, jobs, lambda n, start: job_rows(n, products, orders, rng, start),
+                       [("job", 6), ("CustomerOrderItem", 2), ("task", 2)])
+        _insert_linked(conn, stock, lambda n, start: stock_rows(n, jobs, products, rng, start),
+                       [("stock", 6), ("LotCompletion", 2)])
+    finally:
+        conn.close()
+
+    print(f"✅ MAPS fixture ready at {Maps.SQLITE_PATH}: {products:,} products, {orders:,} orders, "
+          f"{jobs:,} jobs, {stock:,} stock rows in {time.perf_counter() - started:.1f}s")
+
+
+def touch_maps(edit_fraction=0.01, new_jobs=1000, new_stock=10000, seed=11):
+    """
+    Simulate activity since the last sync: edit a fraction of existing rows
+    (only a full reconcile sees these) and append new ones (past the watermark).
+    """
+    rng = random.Random(seed)
+    conn = Maps.get_connection()
+    try:
+        cursor = conn.cursor()
+        max_job, = cursor.execute("SELECT COALESCE(MAX(Id), 0) FROM job").fetchone()
+        max_stock, = cursor.execute("SELECT COALESCE(MAX(Id), 0) FROM stock").fetchone()
+        products, = cursor.execute("SELECT COUNT(*) FROM Product").fetchone()
+        orders, = cursor.execute("SELECT COUNT(*) FROM CustomerOrder").fetchone()
+
+        cursor.execute("UPDATE job SET Quantity = Quantity + 10 WHERE abs(random()) % 10000 < ?",
+                       (int(edit_fraction * 10000),))
+        edited_jobs = cursor.rowcount
+        cursor.execute("UPDATE stock SET Quantity = Quantity + 1 WHERE abs(random()) % 10000 < ?",
+                       (int(edit_fraction * 10000),))
+        edited_stock = cursor.rowcount
+        conn.commit()
+        cursor.close()
+
+        _insert_linked(conn, new_jobs, lambda n, start: job_rows(n, products, orders, rng, start),
+                       [("job", 6), ("CustomerOrderItem", 2), ("task", 2)], start_id=max_job + 1)
+        _insert_linked(conn, new_stock,
+                       lambda n, start: stock_rows(n, max_job + new_jobs, products, rng, start),
+                       [("stock", 6), ("LotCompletion", 2)], start_id=max_stock + 1)
+    finally:
+        conn.close()
+
+    print(f"✏️ MAPS touched: {edited_jobs:,} jobs / {edited_stock:,} stock edited, "
+          f"{new_jobs:,} jobs / {new_stock:,} stock added")
+
+
+# ==============================
+# YOLLINK (PostgreSQL)
+# ==============================
+def check_local_yollink():
+    """Raise unless DB_SETTINGS is a non-production host and the fixture is opted in."""
+    host = Yollink.DB_SETTINGS["host"]
+    if host in PRODUCTION_HOSTS:
+        raise RuntimeError(f"Refusing to touch production Yollink host {host}: set YOLLINK_DB_HOST "
+                           "to a throw-away PostgreSQL")
+    if os.environ.get(FIXTURE_OPT_IN) != "1":
+        raise RuntimeError(f"Set {FIXTURE_OPT_IN}=1 to let the fixture drop and reseed tables on {host}")
+
+
+def build_yollink(delivery_rows=0, seed=7):
+    """
+    (Re)create the Yollink tables, apply db_schema.py and optionally seed
+    delivery_instruction with `delivery_rows` synthetic rows.
+    """
+    check_local_yollink()
+    conn = Yollink.require_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            DROP TABLE IF EXISTS yollink_output, yollink_orders, delivery_instruction,
+                delivery_daily_summary, sync_watermark, sync_run_history CASCADE
+        """)
+        for statement in YOLLINK_TABLES:
+            cursor.execute(statement)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    apply_schema()
+    if delivery_rows:
+        seed_delivery_instructions(delivery_rows, seed=seed)
+    print(f"✅ Yollink fixture ready on {Yollink.DB_SETTINGS['host']}/{Yollink.DB_SETTINGS['database']}")
+
+
+def synthetic_db_rows(parts=200, days=90, purchase_schedule=410026130, seed=7):
+    """
+    One DI upload worth of rows in the shape process_pdf() returns, for
+    insert_delivery_instructions() benchmarks: parts x days cells.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for p in range(parts):
+        part_num = f"{p % 999:03d}-F{p:04d}-00"
+        for d in range(days):
+            rows.append({
+                "PurchaseSchedule": purchase_schedule,
+                "Date": (START_DATE + timedelta(days=d)).isoformat(),
+                "CustomerName": "Hong Leong Yamaha Motor Sdn Bhd",
+                "CustomerCode": "46829-P",
+                "PartDesc": f"PART {p}",
+                "PartNum": part_num,
+                "Qty": rng.randrange(0, 50) * 10,
+            })
+    return rows
+
+
+def seed_delivery_instructions(n_rows, versions=3, seed=7):
+    """Bulk-fill delivery_instruction server side and rebuild its summary."""
+    from daily_summary import rebuild_daily_summary
+
+    check_local_yollink()
+    conn = Yollink.require_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT setseed(%s)", (seed / 100.0,))
+        cursor.execute("""
+            INSERT INTO delivery_instruction
+                (purchase_schedule, date_commit, customer_name, customer_code,
+                 customer_part_desc, customer_part_num, quantity, created_at, version)
+            SELECT 410000000 + (g %% 50),
+                   %s::date + (g %% %s),
+                   'Hong Leong Yamaha Motor Sdn Bhd', '46829-P',
+                   'PART ' || (g %% 2000),
+                   lpad(((g %% 2000) %% 999)::text, 3, '0') || '-F' || lpad((g %% 2000)::text, 4, '0') || '-00',
+                   (random() * 50)::int * 10,
+                   NOW(),
+                   1 + (g %% %s)
+            FROM generate_series(1, %s) AS g
+        """, (START_DATE, DATE_SPAN_DAYS, versions, n_rows))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    rebuild_daily_summary()
+    print(f"🧪 delivery_instruction seeded with {n_rows:,} rows")
+
+
+# ===========================================
+# RUN
+# ===========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build local MAPS / Yollink stand-ins with synthetic data")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--stock", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--delivery-rows", type=int, default=0)
+    parser.add_argument("--skip-maps", action="store_true")
+    parser.add_argument("--skip-yollink", action="store_true")
+    parser.add_argument("--touch", action="store_true", help="only simulate edits / new rows in MAPS")
+    args = parser.parse_args()
+
+    if args.touch:
+        touch_maps()
+    else:
+        if not args.skip_maps:
+            build_maps(jobs=args.jobs, stock=args.stock, products=args.products)
+        if not args.skip_yollink:
+            build_yollink(delivery_rows=args.delivery_rows)
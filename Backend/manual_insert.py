@@ -1,12 +1,15 @@
 from y_data import get_connection
+from daily_summary import refresh_daily_summary
 
-def manual_data_insert(version, header_data, quantities):
+def manual_data_insert(version, header_data, quantities, qty_type="firm"):
     """
-    Replace (delete + insert) rows for the same purchase_schedule, part_num, and version.
+    Replace (delete + insert) rows for the same purchase_schedule, part_num, version and qty_type
+    ("firm" or "forecast").
     """
     conn = get_connection()
     cur = conn.cursor()
     count = 0
+    affected_dates = set()
 
     purchase_schedule = header_data.get("purchaseSchedule")
     part_number = header_data.get("partNumber")
@@ -24,15 +27,16 @@ def manual_data_insert(version, header_data, quantities):
             AND customer_part_num = %s
             AND version = %s
             AND date_commit = %s
-        """, (purchase_schedule, part_number, version, q["date"]))
+            AND qty_type = %s
+        """, (purchase_schedule, part_number, version, q["date"], qty_type))
 
         cur.execute("""
             INSERT INTO delivery_instruction (
                 purchase_schedule, customer_name, customer_code,
                 customer_part_desc, customer_part_num,
-                date_commit, quantity, version, created_at
+                date_commit, quantity, version, qty_type, created_at
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
         """, (
             purchase_schedule,
             header_data.get("customerName"),
@@ -41,9 +45,14 @@ def manual_data_insert(version, header_data, quantities):
             part_number,
             q["date"],
             q["qty"],
-            version
+            version,
+            qty_type
         ))
         count += 1
+        affected_dates.add(q["date"])
+
+    # 🧮 Keep calendar summary in step (same transaction)
+    refresh_daily_summary(cur, version, affected_dates)
 
     conn.commit()
     cur.close()
@@ -0,0 +1,164 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import pypdfium2 as pdfium
+
+# ==============================
+# MEMORY CHECK: process_pdf peak vs BUDGET and PAGE COUNT
+# ==============================
+# Runs process_pdf on the bundled DI.pdf, low_memory off and on, and on
+# longer PDFs built by repeating its pages. Every run gets a fresh child
+# process, so its peak RSS (sampled every RSS_SAMPLE_SECONDS; covers the
+# numpy / pdfium buffers that tracemalloc does not see) is its own. Fails
+# (exit 1) when
+#
+#   - a run on the sample PDF peaks above --budget-mb RSS, either mode
+#   - the low-memory RSS growth over the child's baseline rises more than
+#     --tolerance from the shortest to the longest PDF
+#
+# tesseract runs as a separate process, so OCR never counts toward these
+# peaks; without a tesseract binary the cells are read as blank (--no-ocr).
+#
+#   python mem_check.py                      # DI.pdf, 3 / 12 / 48 pages
+#   python mem_check.py DI_02.pdf --budget-mb 400 --pages 3 24
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DI.pdf")
+DEFAULT_BUDGET_MB = 300
+RSS_SAMPLE_SECONDS = 0.005
+
+
+def build_long_pdf(sample_pdf, n_pages, out_path):
+    """Write a PDF with n_pages copies of sample_pdf's pages, cycled."""
+    src = pdfium.PdfDocument(sample_pdf)
+    dst = pdfium.PdfDocument.new()
+    try:
+        n_src = len(src)
+        for i in range(n_pages):
+            dst.import_pages(src, [i % n_src])
+        dst.save(out_path)
+    finally:
+        dst.close()
+        src.close()
+    return out_path
+
+
+def _blank_ocr():
+    """Answer every tesseract call with an empty read (no binary here)."""
+    import pytesseract
+
+    pytesseract.image_to_string = lambda *args, **kwargs: ""
+    pytesseract.image_to_data = lambda *args, **kwargs: {
+        key: [] for key in ("text", "conf", "left", "top", "width", "height")
+    }
+
+
+def _measure_child(pdf_path, low_memory, render_backend, ocr, results):
+    """Child process body: one process_pdf run, peaks put on `results`."""
+    if not ocr:
+        _blank_ocr()
+    from DIExtract07 import current_rss_mb, process_pdf
+
+    baseline = current_rss_mb()
+    peak = [baseline]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(RSS_SAMPLE_SECONDS):
+            peak[0] = max(peak[0], current_rss_mb())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    with tempfile.TemporaryDirectory() as out_dir:
+        tracemalloc.start()
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            process_pdf(pdf_path, out_dir=out_dir, low_memory=low_memory,
+                        render_backend=render_backend, save_images=False)
+            seconds = time.perf_counter() - started
+            _, traced = tracemalloc.get_traced_memory()
+        finally:
+            done.set()
+            sampler.join()
+            tracemalloc.stop()
+    peak[0] = max(peak[0], current_rss_mb())
+    results.put({"rss": peak[0], "growth": peak[0] - baseline, "traced": traced / 2**20, "seconds": seconds})
+
+
+def measure(pdf_path, low_memory, render_backend="pdfium", ocr=True):
+    """
+    {"rss", "growth", "traced" (MB), "seconds"} of one process_pdf run in a
+    fresh process: peak RSS, peak RSS over the child's baseline after
+    imports, and peak tracemalloc'd Python memory.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=_measure_child, args=(pdf_path, low_memory, render_backend, ocr, results))
+    child.start()
+    child.join()
+    if child.exitcode != 0:
+        raise RuntimeError(f"process_pdf failed on {pdf_path} (low_memory={low_memory}), exit code {child.exitcode}")
+    return results.get()
+
+
+def check(sample_pdf, page_counts, budget_mb, tolerance, render_backend="pdfium", ocr=True):
+    failures = []
+    print(f"\n{'pdf':<12}{'low-mem':>8}{'RSS MB':>9}{'growth MB':>11}{'traced MB':>11}{'s':>7}")
+
+    def report(label, low_memory, result):
+        print(f"{label:<12}{'on' if low_memory else 'off':>8}{result['rss']:>9.1f}"
+              f"{result['growth']:>11.1f}{result['traced']:>11.1f}{result['seconds']:>7.1f}")
+
+    # Budget: the sample as it is, both modes
+    for low_memory in (False, True):
+        result = measure(sample_pdf, low_memory, render_backend, ocr)
+        report(os.path.basename(sample_pdf), low_memory, result)
+        if result["rss"] > budget_mb:
+            failures.append(f"{os.path.basename(sample_pdf)} low_memory={low_memory}: "
+                            f"RSS peak {result['rss']:.0f} MB > budget {budget_mb} MB")
+
+    # Flatness: low-memory growth must not follow the page count
+    growth = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in page_counts:
+            pdf_path = build_long_pdf(sample_pdf, n, os.path.join(tmp, f"di_{n}.pdf"))
+            result = measure(pdf_path, True, render_backend, ocr)
+            report(f"{n} pages", True, result)
+            growth[n] = result["growth"]
+    smallest, largest = growth[page_counts[0]], growth[page_counts[-1]]
+    rise = largest / smallest - 1 if smallest > 0 else 0.0
+    if rise > tolerance:
+        failures.append(f"low-memory RSS growth rose {rise:.0%} from {page_counts[0]} to "
+                        f"{page_counts[-1]} pages (allowed {tolerance:.0%})")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"✅ RSS within {budget_mb} MB both modes; low-memory growth rose {rise:.0%} "
+              f"from {page_counts[0]} to {page_counts[-1]} pages (allowed {tolerance:.0%})")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check process_pdf peak memory against a budget and page count")
+    parser.add_argument("sample_pdf", nargs="?", default=SAMPLE_PDF)
+    parser.add_argument("--budget-mb", type=float, default=DEFAULT_BUDGET_MB, help="RSS ceiling for the sample PDF")
+    parser.add_argument("--pages", type=int, nargs="+", default=[3, 12, 48])
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth rise, e.g. 0.25 = 25%%")
+    parser.add_argument("--render-backend", choices=("pdfium", "pdfplumber"), default="pdfium")
+    parser.add_argument("--no-ocr", action="store_true", help="read every cell as blank instead of calling tesseract")
+    args = parser.parse_args()
+
+    import pytesseract
+
+    ocr = not args.no_ocr
+    if ocr and shutil.which(pytesseract.pytesseract.tesseract_cmd) is None:
+        print("⚠️ tesseract not found; running with --no-ocr")
+        ocr = False
+    ok = check(args.sample_pdf, sorted(args.pages), args.budget_mb, args.tolerance, args.render_backend, ocr)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+
+# ==============================
+# OCR PREPROCESSING (once per page image)
+# ==============================
+# The qty region as rendered is anti-aliased gray with the table's ruling
+# lines in it; every cell crop carries `pad` pixels of the column borders.
+# clean_image() turns the whole region into black-on-white digits only:
+#
+#   1. adaptive binarization, limited to pixels darker than INK_LEVEL so
+#      the gray shading behind firm values is not ink -> ink mask
+#   2. horizontal rules: closing (bridges dotted rules) then opening with a
+#      long horizontal kernel. Vertical rules: opening only, and a vertical
+#      run is a rule when it spans RULE_SPAN of the clip's height or sits on
+#      a column boundary (k * cell width +- pad). Never bridged vertically: a
+#      firm digit, its underline and the forecast digit below are stacked
+#      within a few pixels and would close into one tall "rule".
+#      The rules are removed from the mask
+#   3. mask back to a white image (255) with black (0) digits
+#
+# tight_crop() then drops short ink fragments touching the cell's edge
+# (tops of the next line's digits cut by the crop) and cuts the cell down to
+# its digits' bounding box plus a small white margin, or says it is blank. Sizes are given at 300 DPI and
+# scaled to the render DPI.
+
+BASE_DPI = 300
+BLOCK_SIZE = 31        # adaptive threshold neighbourhood (pixels)
+THRESHOLD_C = 15       # how much darker than the neighbourhood counts as ink
+INK_LEVEL = 160        # and never lighter than this (cell shading is ~200)
+RULE_GAP = 2           # dots of a dotted rule are at most this far apart (wider joins "000" into a rule)
+RULE_LENGTH = 45       # shortest run treated as a ruling line (~ 2 digit heights)
+RULE_SPAN = 0.9        # a vertical run this share of the clip's height is a rule anywhere
+CROP_MARGIN = 8        # white border kept around the digits
+MIN_INK_PIXELS = 30    # fewer ink pixels than this = blank cell
+MIN_GLYPH_HEIGHT = 12  # ink cut by the cell edge and shorter than this is a fragment
+
+
+def _px(value, dpi):
+    return max(int(round(value * dpi / BASE_DPI)), 1)
+
+
+def _morph(mask, op, size):
+    # Outside the image is paper, not ink (OpenCV's default erosion border
+    # would turn any stroke touching the edge into a "rule")
+    return cv2.morphologyEx(mask, op, cv2.getStructuringElement(cv2.MORPH_RECT, size),
+                            borderType=cv2.BORDER_CONSTANT, borderValue=0)
+
+
+def _column_edges(width, num_cols, pad_px):
+    """bool per pixel column: within pad_px of a cell boundary (k * (width // num_cols))."""
+    near = np.zeros(width, dtype=bool)
+    cell_width = width // num_cols
+    tol = max(pad_px, 1)
+    for k in range(num_cols + 1):
+        x = min(k * cell_width, width - 1)
+        near[max(x - tol, 0):x + tol + 1] = True
+    return near
+
+
+def ink_mask(gray, dpi=BASE_DPI, num_cols=None, pad_px=0):
+    """
+    uint8 mask (255 = ink) of a grayscale image, ruling lines removed.
+    num_cols / pad_px give the cell grid of the clip (as crop_qty_rows cuts
+    it), so short vertical rules are only looked for on its boundaries.
+    """
+    block = _px(BLOCK_SIZE, dpi) | 1  # odd
+    ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV,
+                                max(block, 3), THRESHOLD_C)
+    ink[gray >= INK_LEVEL] = 0
+
+    # A rule crossing a whole clip smaller than RULE_LENGTH (a single
+    # re-rendered cell) is still a rule
+    h, w = gray.shape
+    length, gap = _px(RULE_LENGTH, dpi), _px(RULE_GAP, dpi) + 1
+    length_x, length_y = max(min(length, w - 2), 2), max(min(length, h - 2), 2)
+    horizontal = _morph(_morph(ink, cv2.MORPH_CLOSE, (gap, 1)), cv2.MORPH_OPEN, (length_x, 1))
+    vertical = _morph(ink, cv2.MORPH_OPEN, (1, max(int(h * RULE_SPAN), 2)))
+    if num_cols:
+        on_edge = _morph(ink, cv2.MORPH_OPEN, (1, length_y))
+        on_edge[:, ~_column_edges(w, num_cols, pad_px)] = 0
+        vertical |= on_edge
+    # grow the lines by a pixel to take their anti-aliased fringe too
+    rules = cv2.dilate(horizontal | vertical, np.ones((3, 3), np.uint8))
+    return cv2.bitwise_and(ink, cv2.bitwise_not(rules))
+
+
+def clean_image(gray, dpi=BASE_DPI, num_cols=None, pad_px=0):
+    """Black digits on white, no ruling lines; same shape as gray."""
+    return cv2.bitwise_not(ink_mask(gray, dpi, num_cols, pad_px))
+
+
+def tight_crop(cell, dpi=BASE_DPI):
+    """
+    Crop a clean_image() cell to its ink bounding box plus CROP_MARGIN of
+    white, ignoring fragments: ink components cut by the cell's edge and
+    shorter than MIN_GLYPH_HEIGHT. Returns None for a blank cell.
+    """
+    h, w = cell.shape
+    n, labels, stats, _ = cv2.connectedComponentsWithStats((cell < 128).view(np.uint8), connectivity=8)
+    left, top = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+    right, bottom = left + stats[:, cv2.CC_STAT_WIDTH], top + stats[:, cv2.CC_STAT_HEIGHT]
+    at_edge = (left == 0) | (top == 0) | (right == w) | (bottom == h)
+    keep = ~at_edge | (stats[:, cv2.CC_STAT_HEIGHT] >= _px(MIN_GLYPH_HEIGHT, dpi))
+    keep[0] = False  # background
+    if stats[keep, cv2.CC_STAT_AREA].sum() < _px(MIN_INK_PIXELS, dpi):
+        return None
+
+    ink = keep[labels]
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    digits = np.where(ink, cell, 255).astype(np.uint8)[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+    margin = _px(CROP_MARGIN, dpi)
+    return cv2.copyMakeBorder(digits, margin, margin, margin, margin, cv2.BORDER_CONSTANT, value=255)
@@ -0,0 +1,68 @@
+import ctypes
+import math
+
+import numpy as np
+import pypdfium2 as pdfium
+import pypdfium2.raw as pdfium_c
+
+# ==============================
+# CLIP RASTERIZATION (pypdfium2)
+# ==============================
+# Renders just one rectangle of a page straight into an 8-bit grayscale
+# NumPy buffer: pdfium draws into memory numpy owns (FPDFBitmap_Gray over the
+# array's data), so there is no full-page render, no RGB -> gray conversion,
+# no PNG encode/decode and no copy.
+#
+# bbox values are pdfplumber coordinates (x0, top, x1, bottom) in points,
+# top-left origin, so crop_region()/CroppedPage.bbox can be passed directly.
+
+DEFAULT_DPI = 300
+RENDER_FLAGS = pdfium_c.FPDF_ANNOT | pdfium_c.FPDF_GRAYSCALE
+
+
+def open_document(pdf_path):
+    """pypdfium2 document for render_clip_gray(); close() it when done."""
+    return pdfium.PdfDocument(pdf_path)
+
+
+def clip_shape(bbox, dpi=DEFAULT_DPI):
+    """(height, width) in pixels of bbox rendered at dpi."""
+    scale = dpi / 72.0
+    x0, top, x1, bottom = bbox
+    return max(int(round((bottom - top) * scale)), 1), max(int(round((x1 - x0) * scale)), 1)
+
+
+def render_clip_gray(page, bbox, dpi=DEFAULT_DPI, out=None):
+    """
+    Rasterize only `bbox` of a pypdfium2 page at `dpi`.
+    Returns a C-contiguous uint8 array (height, width), white = 255.
+    `out` may be a preallocated array of clip_shape(bbox, dpi) to reuse.
+    """
+    scale = dpi / 72.0
+    x0, top, x1, bottom = bbox
+    height, width = clip_shape(bbox, dpi)
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint8)
+    elif out.shape != (height, width) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError(f"out must be a C-contiguous uint8 array of shape {(height, width)}")
+    out.fill(255)
+
+    page_w, page_h = page.get_size()
+    bitmap = pdfium_c.FPDFBitmap_CreateEx(
+        width, height, pdfium_c.FPDFBitmap_Gray,
+        out.ctypes.data_as(ctypes.c_void_p), out.strides[0],
+    )
+    if not bitmap:
+        raise MemoryError(f"pdfium could not allocate a {width}x{height} bitmap")
+    try:
+        # Whole page scaled to dpi, shifted so the clip's corner lands at (0, 0);
+        # pdfium only rasterizes what falls inside the bitmap
+        pdfium_c.FPDF_RenderPageBitmap(
+            bitmap, page.raw,
+            -math.floor(x0 * scale), -math.floor(top * scale),
+            int(round(page_w * scale)), int(round(page_h * scale)),
+            0, RENDER_FLAGS,
+        )
+    finally:
+        pdfium_c.FPDFBitmap_Destroy(bitmap)
+    return out
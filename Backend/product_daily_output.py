@@ -1,17 +1,22 @@
-import MAPS_CONN2 as Maps
-import y_data as Yollink
-import pandas as pd
-from datetime import datetime
-import traceback
+import argparse
+from chunked_sync import DEFAULT_CHUNK_SIZE
+from sync_engine import run_sync
+from stock_netting import refresh_open_months
 
 # ===========================================
-# STEP 1: Extract Data from MAPS (Stock)
+# MAPS stock-in -> Yollink yollink_output
 # ===========================================
-def extract_maps_stock():
-    try:
-        sql = """
+# Monotonic MAPS column used as high-water mark. st.Id catches new stock rows;
+# switch to CAST(st.<rowversion column> AS BIGINT) if the table gets one, to
+# also catch edits between full reconciles.
+STOCK_WATERMARK_COLUMN = "st.Id"
+
+STOCK_SYNC = {
+    "name": "stock",
+    "source_sql": f"""
         SELECT 
             st.id AS stockid,
+            CAST({STOCK_WATERMARK_COLUMN} AS BIGINT) AS Watermark,
             CAST(st.DateCreated AS DATE) AS DateTransaction,
             prod.PartNumber AS PartNumber,
             prod.Name AS PartDesc,
@@ -31,164 +36,45 @@ def extract_maps_stock():
             st.Type = 0 
             AND st.LotCompletionId IS NOT NULL 
             AND prod.IsFinal = 1 
-            AND co.PONumber IS NOT NULL;
-        """
-        conn = Maps.get_connection()
-        df = pd.read_sql(sql, conn)
-        conn.close()
-        print(f"✅ MAPS stock data extracted: {len(df)} rows")
-        return df
-    except Exception as e:
-        print("❌ Failed to extract MAPS stock data:", e)
-        traceback.print_exc()
-        return pd.DataFrame()
+            AND co.PONumber IS NOT NULL
+    """,
+    "watermark_column": STOCK_WATERMARK_COLUMN,
+    "target_table": "yollink_output",
+    "key": "stockid",
+    # MAPS column -> yollink_output column; all non-key columns feed row_digest
+    "columns": {
+        "stockid": "stockid",
+        "DateTransaction": "datetransaction",
+        "PartNumber": "partnumber",
+        "PartDesc": "partdesc",
+        "CustPartNumber": "custpartnumber",
+        "StockIn": "stockin",
+        "Job_orderNum": "job_ordernum",
+        "CO_orderNum": "co_ordernum",
+        "CustomerPONum": "customerponum",
+    },
+    # Digest normalisation of the non-text columns (see row_digest.py)
+    "column_types": {"DateTransaction": "datetime", "StockIn": "number"},
+    # Projected on-hand depends on stock-in and plans
+    "after_sync": [refresh_open_months],
+}
 
 # ===========================================
-# STEP 2: Extract Data from Yollink
+# Main
 # ===========================================
-def extract_yollink_stock():
-    try:
-        sql = """
-        SELECT 
-            stockid,
-            datetransaction,
-            partnumber,
-            partdesc,
-            custpartnumber,
-            stockin,
-            job_ordernum,
-            co_ordernum,
-            customerponum
-        FROM yollink_output
-        """
-        conn = Yollink.get_connection()
-        df = pd.read_sql(sql, conn)
-        conn.close()
-        print(f"✅ Yollink stock data extracted: {len(df)} rows")
-        return df
-    except Exception as e:
-        print("❌ Failed to extract Yollink stock data:", e)
-        traceback.print_exc()
-        return pd.DataFrame()
-
-# ===========================================
-# STEP 3: Compare Both Data Sources
-# ===========================================
-def compare_stock_data(df_maps, df_yollink):
-    try:
-        if df_maps.empty or df_yollink.empty:
-            print("⚠️ One of the datasets is empty — performing full transfer.")
-            return df_maps, pd.DataFrame()
-
-        merged = df_maps.merge(df_yollink, on="stockid", how="outer", suffixes=("_maps", "_yollink"), indicator=True)
-
-        new_rows = merged[merged["_merge"] == "left_only"]
-        modified_rows = merged[
-            (merged["_merge"] == "both") &
-            (
-                (merged["stockin_maps"] != merged["stockin_yollink"]) |
-                (merged["datetransaction_maps"] != merged["datetransaction_yollink"])
-            )
-        ]
-
-        print(f"🆕 New rows to insert: {len(new_rows)}")
-        print(f"🧾 Rows to update: {len(modified_rows)}")
-        return new_rows, modified_rows
-    except Exception as e:
-        print("❌ Comparison failed:", e)
-        traceback.print_exc()
-        return pd.DataFrame(), pd.DataFrame()
-
-# ===========================================
-# STEP 4: Insert & Update
-# ===========================================
-def update_yollink_stock(new_rows, modified_rows):
-    try:
-        conn = Yollink.get_connection()
-        cursor = conn.cursor()
-
-        for _, row in new_rows.iterrows():
-            cursor.execute("""
-                INSERT INTO yollink_output (
-                    stockid, datetransaction, partnumber, partdesc, custpartnumber,
-                    stockin, job_ordernum, co_ordernum, customerponum, updated_at
-                )
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (stockid) DO NOTHING;
-            """, (
-                row["stockid"], row["DateTransaction"], row["PartNumber"], row["PartDesc"],
-                row["CustPartNumber"], row["StockIn"], row["Job_orderNum"], 
-                row["CO_orderNum"], row["CustomerPONum"], datetime.now()
-            ))
-
-        for _, row in modified_rows.iterrows():
-            cursor.execute("""
-                UPDATE yollink_stockin
-                SET stockin = %s,
-                    datetransaction = %s,
-                    updated_at = %s
-                WHERE stockid = %s;
-            """, (row["StockIn"], row["DateTransaction"], datetime.now(), row["stockid"]))
-
-        conn.commit()
-        conn.close()
-        print("✅ Yollink stock table successfully updated.")
-    except Exception as e:
-        print("❌ Failed to update Yollink stock table:", e)
-        traceback.print_exc()
-
-# ===========================================
-# STEP 5: Full Transfer if Empty
-# ===========================================
-def full_transfer_stock(df_maps):
-    try:
-        conn = Yollink.get_connection()
-        cursor = conn.cursor()
-
-        for _, row in df_maps.iterrows():
-            cursor.execute("""
-                INSERT INTO yollink_output (
-                    stockid, datetransaction, partnumber, partdesc, custpartnumber,
-                    stockin, job_ordernum, co_ordernum, customerponum, updated_at
-                )
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (stockid) DO NOTHING;
-            """, (
-                row["stockid"], row["DateTransaction"], row["PartNumber"], row["PartDesc"],
-                row["CustPartNumber"], row["StockIn"], row["Job_orderNum"],
-                row["CO_orderNum"], row["CustomerPONum"], datetime.now()
-            ))
-
-        conn.commit()
-        conn.close()
-        print("✅ Full stock data transferred successfully.")
-    except Exception as e:
-        print("❌ Full stock transfer failed:", e)
-        traceback.print_exc()
-
-# ===========================================
-# STEP 6: Main
-# ===========================================
-def main():
-    try:
-        print("🚀 Starting stock synchronization...")
-
-        df_maps = extract_maps_stock()
-        df_yollink = extract_yollink_stock()
-
-        if df_yollink.empty:
-            full_transfer_stock(df_maps)
-        else:
-            new_rows, modified_rows = compare_stock_data(df_maps, df_yollink)
-            update_yollink_stock(new_rows, modified_rows)
-
-        print("🎯 Stock sync complete.")
-    except Exception as e:
-        print("❌ Main function failed:", e)
-        traceback.print_exc()
+def main(full_reconcile=False, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, concurrent=True):
+    return run_sync(STOCK_SYNC, full_reconcile=full_reconcile,
+                    streaming=streaming, chunk_size=chunk_size, concurrent=concurrent)
 
 # ===========================================
 # RUN
 # ===========================================
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="MAPS -> Yollink stock sync")
+    parser.add_argument("--full", action="store_true", help="force a full reconcile")
+    parser.add_argument("--stream", action="store_true", help="read MAPS in bounded-memory chunks")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--sequential", action="store_true", help="read MAPS and Yollink one after the other")
+    args = parser.parse_args()
+    main(full_reconcile=args.full, streaming=args.stream, chunk_size=args.chunk_size,
+         concurrent=not args.sequential)
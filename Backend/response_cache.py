@@ -0,0 +1,131 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# ==============================
+# READ-THROUGH RESPONSE CACHE
+# ==============================
+# Keys are (endpoint, month, year, version[, extra...]). Values are the already-encoded
+# JSON body plus its ETag, so a hit costs no DB round trip and no encoding.
+# The cache lives in the Flask process; each worker keeps its own copy.
+
+def _norm(value):
+    """Normalize query-string values so '10', '010' and 10 share a key."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def months_of(dates):
+    """
+    Collect {(month, year)} from 'YYYY-MM-DD' strings or date objects.
+    """
+    months = set()
+    for d in dates:
+        if not d:
+            continue
+        if hasattr(d, "month"):
+            months.add((d.month, d.year))
+        else:
+            text = str(d)
+            months.add((int(text[5:7]), int(text[0:4])))
+    return months
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache with a per-entry TTL.
+    Entries: key -> {"etag", "body", "expires_at"}
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidate(); lets a slow reader detect that a write
+        # happened while it was still building its body
+        self.generation = 0
+
+    @staticmethod
+    def make_key(endpoint, month=None, year=None, version=None, *extra):
+        """
+        `extra` tags the key with a data token the writers here don't see
+        (e.g. the last MAPS sync time); a new token simply misses, and the
+        old entry ages out.
+        """
+        return (endpoint, _norm(month), _norm(year), _norm(version)) + tuple(str(e) for e in extra)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry["expires_at"] <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, generation=None):
+        """
+        Store an encoded body (bytes or str) and return the new entry.
+        If `generation` is given and an invalidation happened since, the entry
+        is returned but not stored.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        entry = {
+            "etag": hashlib.sha1(body).hexdigest(),
+            "body": body,
+            "expires_at": time.monotonic() + self.ttl_seconds,
+        }
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, months, version=None):
+        """
+        Drop entries that could include rows of the given months/version.
+        Entries without a month (or version) filter span everything, so they
+        are always affected.
+        """
+        months = {(_norm(m), _norm(y)) for m, y in months}
+        version = _norm(version)
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key for key in self._entries
+                if (key[3] is None or version is None or key[3] == version)
+                and (key[1] is None or key[2] is None or (key[1], key[2]) in months)
+            ]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            print(f"🧹 Response cache: invalidated {len(stale)} entr{'y' if len(stale) == 1 else 'ies'}")
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {"entries": size, "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+# ==============================
+# ROW FINGERPRINTS
+# ==============================
+# A 64-bit hash over all synced columns of a row, stored next to the row in
+# Yollink (row_digest BIGINT). Change detection then only needs key -> digest
+# from the target instead of every compared column.
+#
+# Values are normalised first so the same MAPS row hashes identically whether
+# it came through pd.read_sql or a chunked fetch (Decimal vs float, date vs
+# Timestamp, None vs NaN). The normalisation of a column comes from its
+# declared type, never from the values: a column that is all NULL in one
+# chunk must hash like the same column with values in another.
+#
+#   "number"    -> float64 (NULL = NaN)
+#   "datetime"  -> 'YYYY-MM-DD HH:MM:SS' string (NULL = <NA>)
+#   "text"      -> stripped string (NULL = <NA>)
+
+DIGEST_TYPES = ("number", "datetime", "text")
+
+
+def _normalize(series, kind):
+    if kind == "number":
+        return pd.to_numeric(series, errors="coerce").astype("float64")
+    if kind == "datetime":
+        return pd.to_datetime(series, errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S").astype("string")
+    if kind == "text":
+        return series.astype("string").str.strip()
+    raise ValueError(f"Unknown digest column type {kind!r}, expected one of {DIGEST_TYPES}")
+
+
+def row_digest(df, column_types):
+    """
+    Vectorized digest of the columns in `column_types` ({column: type}, see
+    DIGEST_TYPES) for every row of df, as signed int64 (fits a PostgreSQL
+    BIGINT).
+    """
+    if df.empty:
+        return pd.Series([], dtype="int64", index=df.index)
+    normalized = pd.DataFrame({c: _normalize(df[c], kind) for c, kind in column_types.items()},
+                              index=df.index)
+    hashed = pd.util.hash_pandas_object(normalized, index=False)
+    return pd.Series(hashed.values.view(np.int64), index=df.index)
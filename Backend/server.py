@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, Response
 from flask_cors import CORS
 from pathlib import Path
 from datetime import datetime
@@ -8,6 +8,10 @@ import os
 import json
 from y_data import get_connection
 from manual_insert import manual_data_insert
+from response_cache import ResponseCache, months_of
+from api_response import timed_dumps, json_response, encoded_response, streamed_response, record_metrics, metrics_report
+from stock_netting import netting_months, refresh_months as refresh_netting_months
+from di_matrix import QTY_TYPES
 
 # ==============================
 # CONFIGURATION
@@ -17,6 +21,58 @@ CORS(app)  # allow access from your React app
 
 BASE_FOLDER = Path(r"C:\Users\abang\Documents\ReactPython\DIExtractor\PDFs")
 
+# Calendar / matrix / coverage / netting responses, invalidated by /upload and /manual_upload
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL_SECONDS = 300
+response_cache = ResponseCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+
+# Matrix parts fetched per server-side cursor batch; more parts than this are streamed
+MATRIX_STREAM_BATCH = 500
+
+# PDF extraction: release page caches as pages finish; optional RSS ceiling (MB)
+PDF_LOW_MEMORY = True
+PDF_RSS_BUDGET_MB = None
+# "pdfium" renders only the qty region in grayscale; "pdfplumber" is the original path
+PDF_RENDER_BACKEND = "pdfium"
+PDF_RENDER_DPI = 300
+PDF_SAVE_OCR_IMAGES = True   # per-row / per-cell PNGs under rows_out, for debugging
+# OCR every cell at PDF_OCR_LOW_DPI, re-read only low-confidence cells at PDF_RENDER_DPI (pdfium only)
+PDF_ADAPTIVE_OCR = False
+PDF_OCR_LOW_DPI = 150
+# One tesseract call per page over a montage of all inked cells
+PDF_MONTAGE_OCR = False
+# Binarize + strip ruling lines once per page, tight-crop cells, skip blank ones.
+# Off until `bench_ocr.py --preprocess --golden ...` shows no accuracy loss
+# against the plain path on real DIs
+PDF_OCR_PREPROCESS = False
+# Also read the forecast half of every DI row (stored with qty_type 'forecast')
+PDF_EXTRACT_FORECAST = True
+
+# Upper bound for /api/sync-runs?limit=
+SYNC_RUNS_MAX_LIMIT = 500
+
+# sync_watermark job whose runs refresh yollink_orders (see jtc_plan_data.py)
+PLAN_SYNC_JOB = "plan"
+
+
+# ==============================
+# CACHED JSON RESPONSES
+# ==============================
+def cached_response(entry, encode_ms=0.0):
+    """
+    Serve a cache entry, answering 304 when the client already has it.
+    """
+    if request.if_none_match.contains(entry["etag"]):
+        response = Response(status=304)
+        record_metrics(request.url_rule.rule, 0, 0, 0.0)
+    else:
+        # compressed variants are memoised on the entry itself
+        response = encoded_response(entry["body"], encodings=entry.setdefault("encodings", {}),
+                                    encode_ms=encode_ms)
+    response.set_etag(entry["etag"])
+    response.headers["Cache-Control"] = "no-cache"  # always revalidate
+    return response
+
 # ==============================
 # API ROUTE — UPLOAD & PROCESS PDF
 # ==============================
@@ -28,7 +84,7 @@ def upload_pdf():
     Then calls DIExtract.process_pdf() to extract and insert data.
     """
     if "file" not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
+        return json_response({"error": "No file uploaded"}), 400
 
     file = request.files["file"]
     factory = request.form.get("factory", "F1")
@@ -51,16 +107,30 @@ def upload_pdf():
         # -------------------------------
         # Run the full extraction pipeline
         # -------------------------------
-        result = process_pdf(str(file_path), out_dir=str(folder_path / "rows_out"))
+        result = process_pdf(str(file_path), out_dir=str(folder_path / "rows_out"),
+                             low_memory=PDF_LOW_MEMORY, rss_budget_mb=PDF_RSS_BUDGET_MB,
+                             render_backend=PDF_RENDER_BACKEND, dpi=PDF_RENDER_DPI,
+                             save_images=PDF_SAVE_OCR_IMAGES,
+                             adaptive=PDF_ADAPTIVE_OCR, low_dpi=PDF_OCR_LOW_DPI,
+                             montage=PDF_MONTAGE_OCR, preprocess=PDF_OCR_PREPROCESS,
+                             forecast=PDF_EXTRACT_FORECAST)
 
         # ❌ FIX: result.get().get(...) is invalid
         # ✅ Correct:
-        db_rows = result.get("db_rows", [])
-        insert_delivery_instructions(db_rows, version)
+        matrix = result["matrix"]
+        forecast = result.get("forecast")
+        # Months of the rows replaced as well as the new ones: the PO's older
+        # rows of this version may fall in other months
+        affected_dates = insert_delivery_instructions(matrix, version, forecast=forecast)
+        months = months_of(affected_dates)
+        # recomputed from firm rows; emptied months are cleared, and the next
+        # month's opening stock nets this demand too
+        refresh_netting_months(version, netting_months(affected_dates))
+        response_cache.invalidate(months, version)
 
         header = result.get("header", {})
         total_parts = len(result.get("parts", []))
-        total_rows = len(db_rows)
+        total_rows = len(matrix)
 
         print(f"✅ Extraction complete for {file.filename}")
         print(f"📊 Found {total_parts} part lines, {total_rows} DB rows ready")
@@ -68,20 +138,22 @@ def upload_pdf():
         # -------------------------------
         # Prepare response for React
         # -------------------------------
-        return jsonify({
+        return json_response({
             "status": "success",
             "message": "File processed successfully",
             "saved_to": str(file_path),
             "header": header,
             "total_parts": total_parts,
             "total_db_rows": total_rows,
+            "total_forecast_rows": len(forecast) if forecast is not None else 0,
+            "ocr_stats": result.get("ocr_stats"),
             "version": version,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         })
 
     except Exception as e:
         print(f"❌ Error processing file: {e}")
-        return jsonify({"error": str(e)}), 500
+        return json_response({"error": str(e)}), 500
 
 @app.route("/api/delivery-calendar", methods=["GET"])
 def get_delivery_calendar():
@@ -97,28 +169,49 @@ def get_delivery_calendar():
     year = request.args.get("year", None)
     version = request.args.get("version", None)
 
+    cache_key = ResponseCache.make_key("delivery-calendar", month, year, version)
+    cached = response_cache.get(cache_key)
+    if cached:
+        return cached_response(cached)
+    generation = response_cache.generation
+
     try:
         conn = get_connection()
         cursor = conn.cursor()
 
-        query = """
-        SELECT 
-            date_commit,
-            SUM(quantity) AS total_qty,
-            COUNT(DISTINCT customer_part_num) AS total_parts
-        FROM delivery_instruction
-        WHERE TRUE
-        """
-
-        params = []
-        if month and year:
-            query += " AND EXTRACT(MONTH FROM date_commit) = %s AND EXTRACT(YEAR FROM date_commit) = %s"
-            params.extend([month, year])
         if version:
-            query += " AND version = %s"
-            params.append(version)
+            # Fast path: pre-aggregated per (version, date), see daily_summary.py
+            query = """
+            SELECT
+                date_commit,
+                total_qty,
+                total_parts
+            FROM delivery_daily_summary
+            WHERE version = %s
+            """
+            params = [version]
+            if month and year:
+                query += " AND date_commit >= make_date(%s, %s, 1)" \
+                         " AND date_commit < make_date(%s, %s, 1) + INTERVAL '1 month'"
+                params.extend([year, month, year, month])
+            query += " ORDER BY date_commit"
+        else:
+            # No version given: distinct parts span versions, so aggregate raw rows
+            query = """
+            SELECT 
+                date_commit,
+                SUM(quantity) AS total_qty,
+                COUNT(DISTINCT customer_part_num) AS total_parts
+            FROM delivery_instruction
+            WHERE qty_type = 'firm'
+            """
+
+            params = []
+            if month and year:
+                query += " AND EXTRACT(MONTH FROM date_commit) = %s AND EXTRACT(YEAR FROM date_commit) = %s"
+                params.extend([month, year])
 
-        query += " GROUP BY date_commit ORDER BY date_commit"
+            query += " GROUP BY date_commit ORDER BY date_commit"
 
         cursor.execute(query, params)
         rows = cursor.fetchall()
@@ -132,10 +225,12 @@ def get_delivery_calendar():
             for r in rows
         ]
 
-        return jsonify({"status": "success", "data": result})
+        body, encode_ms = timed_dumps({"status": "success", "data": result})
+        entry = response_cache.put(cache_key, body, generation)
+        return cached_response(entry, encode_ms)
 
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return json_response({"status": "error", "message": str(e)}), 500
     finally:
         cursor.close()
         conn.close()
@@ -144,8 +239,9 @@ def get_delivery_calendar():
 def get_matrix_table():
     """
     Returns structured DI data grouped by part_number and date
-    for a given month, year, and version.
-    Example: /api/matrixtable?month=10&year=2025&version=1
+    for a given month, year, and version; qty_type=forecast returns the
+    forecast figures instead of the firm ones.
+    Example: /api/matrixtable?month=10&year=2025&version=1[&qty_type=forecast]
     """
     import psycopg2
     from y_data import get_connection
@@ -153,67 +249,433 @@ def get_matrix_table():
     month = request.args.get("month", None)
     year = request.args.get("year", None)
     version = request.args.get("version", None)
-
+    qty_type = request.args.get("qty_type", "firm")
+    if qty_type not in QTY_TYPES:
+        return json_response({
+            "status": "error",
+            "message": f"qty_type must be one of: {', '.join(QTY_TYPES)}"
+        }), 400
+
+    cache_key = ResponseCache.make_key("matrixtable", month, year, version, qty_type)
+    cached = response_cache.get(cache_key)
+    if cached:
+        return cached_response(cached)
+
+    generation = response_cache.generation
+    conn = None
     try:
         conn = get_connection()
-        cursor = conn.cursor()
+        # Named cursor = server-side cursor, rows arrive in itersize batches
+        cursor = conn.cursor(name="matrixtable_stream")
+        cursor.itersize = MATRIX_STREAM_BATCH
 
         # Step 1. Filter base condition
-        base_query = """
-            SELECT customer_part_num,
-                customer_part_desc,
-                date_commit,
-                SUM(quantity) AS qty
-            FROM delivery_instruction
-            WHERE TRUE
-        """
-        params = []
+        where = "WHERE qty_type = %s"
+        params = [qty_type]
 
         if month and year:
-            base_query += " AND EXTRACT(MONTH FROM date_commit) = %s AND EXTRACT(YEAR FROM date_commit) = %s"
+            where += " AND EXTRACT(MONTH FROM date_commit) = %s AND EXTRACT(YEAR FROM date_commit) = %s"
             params.extend([month, year])
         if version:
-            base_query += " AND version = %s"
+            where += " AND version = %s"
             params.append(version)
 
-        base_query += " GROUP BY customer_part_num, customer_part_desc, date_commit ORDER BY customer_part_num, date_commit"
+        # Step 2. Pivot in SQL: one JSON object per part, days = {"<day>": qty}
+        cursor.execute(f"""
+            WITH daily AS (
+                SELECT COALESCE(TRIM(customer_part_num), 'UNKNOWN') AS part_number,
+                       MIN(COALESCE(TRIM(customer_part_desc), 'UNKNOWN')) AS part_desc,
+                       date_commit,
+                       SUM(quantity)::bigint AS qty
+                FROM delivery_instruction
+                {where}
+                GROUP BY 1, date_commit
+            )
+            SELECT json_build_object(
+                       'part_number', part_number,
+                       'part_desc', (array_agg(part_desc ORDER BY date_commit))[1],
+                       'days', jsonb_object_agg(EXTRACT(DAY FROM date_commit)::int::text, qty)
+                   )::text
+            FROM daily
+            GROUP BY part_number
+            ORDER BY part_number
+        """, params)
+
+        # Step 3. Small result -> single cached body with ETag
+        first_batch = cursor.fetchmany(MATRIX_STREAM_BATCH)
+        if len(first_batch) < MATRIX_STREAM_BATCH:
+            body = '{"status": "success", "data": [' + ",".join(r[0] for r in first_batch) + "]}"
+            entry = response_cache.put(cache_key, body, generation)
+            cursor.close()
+            conn.close()
+            return cached_response(entry)
 
-        cursor.execute(base_query, params)
+    except Exception as e:
+        if conn:
+            conn.close()
+        return json_response({"status": "error", "message": str(e)}), 500
+
+    # Step 4. Large result -> chunked JSON, cached once fully sent
+    def generate():
+        chunks = ['{"status": "success", "data": [']
+        try:
+            yield chunks[0]
+            batch, sep = first_batch, ""
+            while batch:
+                chunk = sep + ",".join(r[0] for r in batch)
+                chunks.append(chunk)
+                yield chunk
+                sep = ","
+                batch = cursor.fetchmany(MATRIX_STREAM_BATCH)
+            chunks.append("]}")
+            yield chunks[-1]
+            response_cache.put(cache_key, "".join(chunks), generation)
+        except Exception as e:
+            print(f"❌ Matrix stream aborted: {e}")
+        finally:
+            cursor.close()
+            conn.close()
+
+    return streamed_response(generate())
+
+@app.route("/api/version-diff", methods=["GET"])
+def get_version_diff():
+    """
+    Returns only the (part, date) cells whose quantity differs between two
+    versions of one purchase schedule, plus net deltas per part and per day.
+    Example: /api/version-diff?purchase_schedule=410026130&from=1&to=2
+    """
+    purchase_schedule = request.args.get("purchase_schedule", None)
+    from_version = request.args.get("from", None)
+    to_version = request.args.get("to", None)
+
+    if not purchase_schedule or not from_version or not to_version:
+        return json_response({
+            "status": "error",
+            "message": "purchase_schedule, from and to are required"
+        }), 400
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        # One pass over both versions; unchanged cells are dropped by HAVING
+        cursor.execute("""
+            SELECT COALESCE(TRIM(customer_part_num), 'UNKNOWN') AS part_number,
+                   date_commit,
+                   COALESCE(SUM(quantity) FILTER (WHERE version = %(from)s), 0)::bigint AS from_qty,
+                   COALESCE(SUM(quantity) FILTER (WHERE version = %(to)s), 0)::bigint AS to_qty
+            FROM delivery_instruction
+            WHERE purchase_schedule = %(ps)s
+              AND version IN (%(from)s, %(to)s)
+              AND qty_type = 'firm'
+            GROUP BY 1, date_commit
+            HAVING COALESCE(SUM(quantity) FILTER (WHERE version = %(from)s), 0)
+                <> COALESCE(SUM(quantity) FILTER (WHERE version = %(to)s), 0)
+            ORDER BY 1, date_commit
+        """, {"ps": purchase_schedule, "from": from_version, "to": to_version})
         rows = cursor.fetchall()
+        cursor.close()
 
-        # Step 2. Build matrix
-        data_by_part = {}
+        # Unchanged cells contribute 0, so nets over changed cells are exact
+        changes = []
+        part_delta = {}
+        day_delta = {}
+        for part_num, date_commit, from_qty, to_qty in rows:
+            day = str(date_commit)
+            delta = to_qty - from_qty
+            changes.append([part_num, day, from_qty, to_qty, delta])
+            part_delta[part_num] = part_delta.get(part_num, 0) + delta
+            day_delta[day] = day_delta.get(day, 0) + delta
+
+        return json_response({
+            "status": "success",
+            "purchase_schedule": purchase_schedule,
+            "from": from_version,
+            "to": to_version,
+            "changed_cells": len(changes),
+            "columns": ["part_number", "date", "from_qty", "to_qty", "delta"],
+            "changes": changes,
+            "part_delta": part_delta,
+            "day_delta": day_delta,
+        })
 
-        for part_num, part_desc, date_commit, qty in rows:
-            part_num = part_num.strip() if part_num else "UNKNOWN"
-            part_desc = part_desc.strip() if part_desc else "UNKNOWN"
-            day = int(date_commit.day)
+    except Exception as e:
+        return json_response({"status": "error", "message": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
 
-            if part_num not in data_by_part:
-                data_by_part[part_num] = {
-                    "part_desc": part_desc,
-                    "days": {}
-                }
+@app.route("/api/coverage", methods=["GET"])
+def get_coverage():
+    """
+    Cumulative DI demand vs cumulative MAPS job plan per part and day for one
+    month/version, with the dates where demand runs ahead of plan.
+    Example: /api/coverage?month=10&year=2025&version=1
+    """
+    month = request.args.get("month", None)
+    year = request.args.get("year", None)
+    version = request.args.get("version", None)
+
+    if not month or not year or not version:
+        return json_response({
+            "status": "error",
+            "message": "month, year and version are required"
+        }), 400
+    month_num = request.args.get("month", type=int)
+    year_num = request.args.get("year", type=int)
+    if month_num is None or year_num is None or request.args.get("version", type=int) is None:
+        return json_response({
+            "status": "error",
+            "message": "month, year and version must be integers"
+        }), 400
+    if not 1 <= month_num <= 12 or not 1 <= year_num <= 9999:
+        return json_response({
+            "status": "error",
+            "message": "month must be 1-12 and year 1-9999"
+        }), 400
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
 
-            data_by_part[part_num]["days"][str(day)] = int(qty)
+        # yollink_orders is written by the sync process, not by this API, so
+        # its last sync time is part of the cache key
+        cursor.execute("SELECT last_success_at FROM sync_watermark WHERE job_name = %s", (PLAN_SYNC_JOB,))
+        row = cursor.fetchone()
+        plan_synced_at = row[0] if row else None
+
+        cache_key = ResponseCache.make_key("coverage", month, year, version, plan_synced_at)
+        cached = response_cache.get(cache_key)
+        if cached:
+            return cached_response(cached)
+        generation = response_cache.generation
+
+        # Sparse (part, day) cells with demand or plan; running totals per part
+        cursor.execute("""
+            WITH demand AS (
+                SELECT TRIM(customer_part_num) AS part, date_commit AS day, SUM(quantity) AS qty
+                FROM delivery_instruction
+                WHERE version = %(version)s
+                  AND qty_type = 'firm'
+                  AND date_commit >= make_date(%(year)s, %(month)s, 1)
+                  AND date_commit < make_date(%(year)s, %(month)s, 1) + INTERVAL '1 month'
+                GROUP BY 1, 2
+            ),
+            plan AS (
+                SELECT TRIM(custpartnumber) AS part, job_desiredate AS day, SUM(job_quantity) AS qty
+                FROM yollink_orders
+                WHERE job_desiredate >= make_date(%(year)s, %(month)s, 1)
+                  AND job_desiredate < make_date(%(year)s, %(month)s, 1) + INTERVAL '1 month'
+                  AND TRIM(custpartnumber) IN (SELECT part FROM demand)
+                GROUP BY 1, 2
+            ),
+            cells AS (
+                SELECT COALESCE(d.part, p.part) AS part,
+                       COALESCE(d.day, p.day) AS day,
+                       COALESCE(d.qty, 0) AS demand,
+                       COALESCE(p.qty, 0) AS planned
+                FROM demand d
+                FULL JOIN plan p ON p.part = d.part AND p.day = d.day
+            )
+            SELECT part, day, demand::bigint, planned::bigint,
+                   (SUM(demand) OVER w)::bigint AS cum_demand,
+                   (SUM(planned) OVER w)::bigint AS cum_planned
+            FROM cells
+            WINDOW w AS (PARTITION BY part ORDER BY day)
+            ORDER BY part, day
+        """, {"version": version, "year": year_num, "month": month_num})
+        rows = cursor.fetchall()
+        cursor.close()
 
-        # Step 3. Format result
-        result = []
-        for part_num, info in data_by_part.items():
-            result.append({
-                "part_number": part_num,
-                "part_desc": info["part_desc"],
-                "days": info["days"]
-            })
+        parts = {}
+        for part, day, demand, planned, cum_demand, cum_planned in rows:
+            entry = parts.setdefault(part or "UNKNOWN", {"rows": [], "shortfall_dates": [], "max_shortfall": 0})
+            balance = cum_planned - cum_demand
+            entry["rows"].append([str(day), demand, planned, cum_demand, cum_planned, balance])
+            if balance < 0:
+                entry["shortfall_dates"].append(str(day))
+                entry["max_shortfall"] = max(entry["max_shortfall"], -balance)
 
-        return jsonify({"status": "success", "data": result})
+        body, encode_ms = timed_dumps({
+            "status": "success",
+            "month": month,
+            "year": year,
+            "version": version,
+            "plan_synced_at": plan_synced_at,
+            "columns": ["date", "demand", "planned", "cum_demand", "cum_planned", "balance"],
+            "parts": parts,
+            "summary": {
+                "parts": len(parts),
+                "parts_short": sum(1 for p in parts.values() if p["shortfall_dates"]),
+            },
+        })
+        entry = response_cache.put(cache_key, body, generation)
+        return cached_response(entry, encode_ms)
 
     except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return json_response({"status": "error", "message": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@app.route("/api/stock-netting", methods=["GET"])
+def get_stock_netting():
+    """
+    Projected on-hand per part and day (opening stock - DI demand + receipts)
+    from the precomputed stock_netting table; computed on first request.
+    Example: /api/stock-netting?month=10&year=2025&version=1[&part=10C-F5351-00]
+    """
+    month = request.args.get("month", None)
+    year = request.args.get("year", None)
+    version = request.args.get("version", None)
+    part = request.args.get("part", None)
+
+    if not month or not year or not version:
+        return json_response({
+            "status": "error",
+            "message": "month, year and version are required"
+        }), 400
+
+    conn = None
+    try:
+        month_start = datetime(int(year), int(month), 1).date()
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        lookup = """
+            SELECT refreshed_at, opening_days FROM stock_netting_refresh
+            WHERE version = %s AND month_start = %s
+        """
+        cursor.execute(lookup, (version, month_start))
+        row = cursor.fetchone()
+        if row is None:
+            # First request for this month: compute it now
+            refresh_netting_months(int(version), {(month_start.month, month_start.year)})
+            cursor.execute(lookup, (version, month_start))
+            row = cursor.fetchone() or (None, None)
+        refreshed_at, opening_days = row
+
+        cache_key = ResponseCache.make_key("stock-netting", month, year, version, refreshed_at, part)
+        cached = response_cache.get(cache_key)
+        if cached:
+            return cached_response(cached)
+        generation = response_cache.generation
+
+        query = """
+            SELECT part, day, demand, receipts, on_hand
+            FROM stock_netting
+            WHERE version = %s
+              AND day >= %s AND day < %s::date + INTERVAL '1 month'
+        """
+        params = [version, month_start, month_start]
+        if part:
+            query += " AND part = %s"
+            params.append(part.strip())
+        cursor.execute(query + " ORDER BY part, day", params)
+
+        # Rows are dense per part, so every array lines up with "days"
+        days = []
+        parts = {}
+        for part_num, day, demand, receipts, on_hand in cursor.fetchall():
+            entry = parts.get(part_num)
+            if entry is None:
+                entry = parts[part_num] = {"demand": [], "receipts": [], "on_hand": [], "first_negative": None}
+            if len(parts) == 1:
+                days.append(str(day))
+            entry["demand"].append(demand)
+            entry["receipts"].append(receipts)
+            entry["on_hand"].append(on_hand)
+            if on_hand < 0 and entry["first_negative"] is None:
+                entry["first_negative"] = str(day)
+        cursor.close()
+
+        body, encode_ms = timed_dumps({
+            "status": "success",
+            "month": month,
+            "year": year,
+            "version": version,
+            "refreshed_at": refreshed_at,
+            "opening_days": opening_days,
+            "days": days,
+            "parts": parts,
+            "summary": {
+                "parts": len(parts),
+                "parts_negative": sum(1 for p in parts.values() if p["first_negative"]),
+            },
+        })
+        entry = response_cache.put(cache_key, body, generation)
+        return cached_response(entry, encode_ms)
 
+    except Exception as e:
+        return json_response({"status": "error", "message": str(e)}), 500
     finally:
+        if conn:
+            conn.close()
+
+@app.route("/api/sync-runs", methods=["GET"])
+def get_sync_runs():
+    """
+    Recent MAPS -> Yollink sync attempts (sync_daemon.py / CLI), newest first,
+    plus the latest outcome per job.
+    Example: /api/sync-runs?job=stock&limit=50
+    """
+    job = request.args.get("job", None)
+    limit = request.args.get("limit", 50, type=int)
+    if "limit" in request.args and request.args.get("limit", type=int) is None:
+        return json_response({
+            "status": "error",
+            "message": "limit must be an integer"
+        }), 400
+    limit = max(1, min(limit, SYNC_RUNS_MAX_LIMIT))
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        where = "WHERE job_name = %s" if job else ""
+        params = [job] if job else []
+        cursor.execute(f"""
+            SELECT id, job_name, started_at, finished_at, duration_s, outcome, mode,
+                   attempt, rows_source, rows_new, rows_modified, rows_written, phases, error
+            FROM sync_run_history
+            {where}
+            ORDER BY started_at DESC, id DESC
+            LIMIT %s
+        """, params + [limit])
+        columns = [d[0] for d in cursor.description]
+        runs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        cursor.execute("""
+            SELECT DISTINCT ON (job_name) job_name, outcome, finished_at
+            FROM sync_run_history
+            ORDER BY job_name, started_at DESC, id DESC
+        """)
+        latest = {name: {"outcome": outcome, "finished_at": finished_at}
+                  for name, outcome, finished_at in cursor.fetchall()}
         cursor.close()
-        conn.close()
+
+        return json_response({"status": "success", "latest": latest, "runs": runs})
+
+    except Exception as e:
+        return json_response({"status": "error", "message": str(e)}), 500
+    finally:
+        if conn:
+            conn.close()
+
+@app.route("/api/metrics/responses", methods=["GET"])
+def get_response_metrics():
+    """
+    Payload size, compression and encode time per route since startup.
+    """
+    return json_response({
+        "status": "success",
+        "routes": metrics_report(),
+        "cache": response_cache.stats(),
+    })
 
 @app.route("/manual_upload", methods=["POST"])
 def manual_upload():
@@ -222,6 +684,7 @@ def manual_upload():
         month_year = request.form.get("month_year")
         bucket = request.form.get("bucket")
         version = request.form.get("version")
+        qty_type = request.form.get("qty_type") or "firm"
 
         manual_data = json.loads(request.form.get("manual_data") or "{}")
         quantities = json.loads(request.form.get("quantities") or "[]")
@@ -231,21 +694,31 @@ def manual_upload():
         print("Month-Year:", month_year)
         print("Bucket:", bucket)
         print("Version:", version)
+        print("Quantity type:", qty_type)
         print("Manual Data:", manual_data)
         print("Quantities:", quantities)
 
         required_fields = ["customerName", "customerCode", "partNumber", "partDesc"]
         missing = [f for f in required_fields if not manual_data.get(f)]
         if missing:
-            return jsonify({
+            return json_response({
                 "status": "error",
                 "message": f"Missing required fields: {', '.join(missing)}"
             }), 400
+        if qty_type not in QTY_TYPES:
+            return json_response({
+                "status": "error",
+                "message": f"qty_type must be one of: {', '.join(QTY_TYPES)}"
+            }), 400
 
         # 🧠 Call your single-table insert/update logic
-        rows = manual_data_insert(version, manual_data, quantities)
+        rows = manual_data_insert(version, manual_data, quantities, qty_type)
+        months = months_of(q.get("date") for q in quantities)
+        if qty_type == "firm":
+            refresh_netting_months(version, months)
+        response_cache.invalidate(months, version)
 
-        return jsonify({
+        return json_response({
             "status": "success",
             "inserted_or_updated_rows": rows,
             "saved_to": "delivery_instruction"
@@ -253,7 +726,7 @@ def manual_upload():
 
     except Exception as e:
         print("❌ Error inserting manual data:", e)
-        return jsonify({"status": "error", "message": str(e)}), 500
+        return json_response({"status": "error", "message": str(e)}), 500
 
 
 if __name__ == "__main__":
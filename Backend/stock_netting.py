@@ -0,0 +1,234 @@
+import argparse
+import io
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from y_data import get_connection
+
+# ==============================
+# STOCK NETTING (projected on-hand)
+# ==============================
+# For every part with DI demand in a (version, month), one row per day:
+#
+#   on_hand[d] = opening + cumsum(receipts - demand)[d]
+#
+#   opening   net stock over the OPENING_STOCK_DAYS before the month (up to
+#             today): stock-in (yollink_output) minus the version's firm demand
+#             due in the same days, taken as delivered. Yollink holds no on-hand
+#             balance or shipment table, so this is the closest it can tell.
+#   receipts  actual stock-in for days before today, yollink_orders plan from today on
+#   demand    delivery_instruction firm quantity of the version
+#
+# Computed on a dense part x day numpy array (one cumsum per month) and stored
+# in stock_netting, refreshed after DI uploads and after the stock / plan syncs.
+
+OPENING_STOCK_DAYS = 30
+
+
+def month_bounds(month_start):
+    month_start = date(month_start.year, month_start.month, 1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    return month_start, next_month
+
+
+def netting_months(dates, opening_days=OPENING_STOCK_DAYS):
+    """
+    {(month, year)} whose netting reads firm demand on any of `dates`
+    ('YYYY-MM-DD' strings or date objects): each date's own month and every
+    later month whose opening window covers it.
+    """
+    months = set()
+    for d in dates:
+        if not d:
+            continue
+        day = date(d.year, d.month, d.day) if hasattr(d, "month") else date.fromisoformat(str(d)[:10])
+        month_start, _ = month_bounds(day)
+        last = day + timedelta(days=opening_days)
+        while month_start <= last:
+            months.add((month_start.month, month_start.year))
+            month_start = month_bounds(month_start)[1]
+    return months
+
+
+def _dense(df, part_index, n_days, month_start):
+    """Scatter (part, day, qty) rows into a parts x days int64 array."""
+    grid = np.zeros((len(part_index), n_days), dtype=np.int64)
+    if df.empty:
+        return grid
+    rows = part_index.get_indexer(df["part"])
+    cols = (pd.to_datetime(df["day"]) - pd.Timestamp(month_start)).dt.days.to_numpy()
+    keep = (rows >= 0) & (cols >= 0) & (cols < n_days)
+    np.add.at(grid, (rows[keep], cols[keep]), df["qty"].to_numpy(dtype=np.int64)[keep])
+    return grid
+
+
+def _frame(cursor, sql, params):
+    cursor.execute(sql, params)
+    return pd.DataFrame(cursor.fetchall(), columns=["part", "day", "qty"])
+
+
+def compute_netting(cursor, version, month_start, opening_days=OPENING_STOCK_DAYS, today=None):
+    """
+    Returns (parts, days, demand, receipts, on_hand): a part Index, a list of
+    dates and three parts x days int64 arrays.
+    """
+    month_start, month_end = month_bounds(month_start)
+    today = today or date.today()
+    n_days = (month_end - month_start).days
+    days = [month_start + timedelta(days=i) for i in range(n_days)]
+
+    opening_start = month_start - timedelta(days=opening_days)
+
+    # Firm demand of the month, plus the opening window's (delivered) demand
+    demand_df = _frame(cursor, """
+        SELECT TRIM(customer_part_num), date_commit, COALESCE(SUM(quantity), 0)
+        FROM delivery_instruction
+        WHERE version = %s AND date_commit >= %s AND date_commit < %s AND qty_type = 'firm'
+        GROUP BY 1, 2
+    """, (version, opening_start, month_end))
+    demand_df["qty"] = demand_df["qty"].astype("int64")
+    shipped = pd.to_datetime(demand_df["day"]) < pd.Timestamp(min(month_start, today))
+    in_month = pd.to_datetime(demand_df["day"]) >= pd.Timestamp(month_start)
+    parts = pd.Index(sorted(demand_df.loc[in_month, "part"].dropna().unique()))
+    empty = np.zeros((0, n_days), dtype=np.int64)
+    if parts.empty:
+        return parts, days, empty, empty, empty
+    part_list = list(parts)
+
+    # Actual stock-in before today; plan from today on (a completed job is stock-in)
+    stock_df = _frame(cursor, """
+        SELECT TRIM(custpartnumber), datetransaction, COALESCE(SUM(stockin), 0)
+        FROM yollink_output
+        WHERE TRIM(custpartnumber) = ANY(%s)
+          AND datetransaction >= %s AND datetransaction < LEAST(%s, %s)
+        GROUP BY 1, 2
+    """, (part_list, opening_start, month_end, today))
+    plan_df = _frame(cursor, """
+        SELECT TRIM(custpartnumber), job_desiredate, COALESCE(SUM(job_quantity), 0)
+        FROM yollink_orders
+        WHERE TRIM(custpartnumber) = ANY(%s)
+          AND job_desiredate >= GREATEST(%s, %s) AND job_desiredate < %s
+        GROUP BY 1, 2
+    """, (part_list, month_start, today, month_end))
+
+    stock_df["qty"] = stock_df["qty"].astype("float64").round().astype("int64")
+    before = pd.to_datetime(stock_df["day"]) < pd.Timestamp(month_start)
+    opening = (stock_df[before].groupby("part")["qty"].sum()
+               .sub(demand_df[shipped].groupby("part")["qty"].sum(), fill_value=0)
+               .reindex(parts, fill_value=0).to_numpy(dtype=np.int64))
+
+    demand = _dense(demand_df[in_month], parts, n_days, month_start)
+    receipts = _dense(stock_df[~before], parts, n_days, month_start) \
+        + _dense(plan_df, parts, n_days, month_start)
+    on_hand = opening[:, None] + np.cumsum(receipts - demand, axis=1)
+    return parts, days, demand, receipts, on_hand
+
+
+def refresh_netting(cursor, version, month_start, opening_days=OPENING_STOCK_DAYS):
+    """
+    Recompute stock_netting for one (version, month). Does not commit.
+    Returns the number of rows written.
+    """
+    started = time.perf_counter()
+    month_start, month_end = month_bounds(month_start)
+    parts, days, demand, receipts, on_hand = compute_netting(cursor, version, month_start, opening_days)
+
+    cursor.execute("""
+        DELETE FROM stock_netting
+        WHERE version = %s AND day >= %s AND day < %s
+    """, (version, month_start, month_end))
+
+    n_parts, n_days = on_hand.shape
+    if n_parts:
+        frame = pd.DataFrame({
+            "version": int(version),
+            "part": np.repeat(parts.to_numpy(), n_days),
+            "day": np.tile(np.array(days, dtype="datetime64[D]"), n_parts),
+            "demand": demand.ravel(),
+            "receipts": receipts.ravel(),
+            "on_hand": on_hand.ravel(),
+        })
+        buf = io.StringIO()
+        frame.to_csv(buf, index=False, header=False)
+        buf.seek(0)
+        cursor.copy_expert(
+            "COPY stock_netting (version, part, day, demand, receipts, on_hand) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+
+    cursor.execute("""
+        INSERT INTO stock_netting_refresh (version, month_start, opening_days, refreshed_at)
+        VALUES (%s, %s, %s, NOW())
+        ON CONFLICT (version, month_start) DO UPDATE SET
+            opening_days = EXCLUDED.opening_days,
+            refreshed_at = EXCLUDED.refreshed_at
+    """, (version, month_start, opening_days))
+
+    print(f"📦 Stock netting refreshed: version {version}, {month_start:%Y-%m}, "
+          f"{n_parts} parts x {n_days} days in {time.perf_counter() - started:.2f}s")
+    return n_parts * n_days
+
+
+def refresh_months(version, months):
+    """
+    Refresh the given {(month, year)} of one version in its own transaction.
+    Used after DI uploads; failures are logged, never raised.
+    """
+    conn = get_connection()
+    if conn is None:
+        return
+    cursor = conn.cursor()
+    try:
+        for month, year in sorted(months, key=lambda m: (m[1], m[0])):
+            refresh_netting(cursor, version, date(int(year), int(month), 1))
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Stock netting refresh failed: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def refresh_open_months(stats=None):
+    """
+    Refresh every (version, month) with demand from the current month on.
+    Runs after the stock / plan syncs (see the jobs' "after_sync").
+    """
+    if stats is not None and not stats.get("written"):
+        return  # nothing changed in Yollink
+    conn = get_connection()
+    if conn is None:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT DISTINCT version, date_trunc('month', date_commit)::date
+            FROM delivery_daily_summary
+            WHERE date_commit >= date_trunc('month', CURRENT_DATE)
+            ORDER BY 1, 2
+        """)
+        for version, month_start in cursor.fetchall():
+            refresh_netting(cursor, version, month_start)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Stock netting refresh failed: {e}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh stock_netting")
+    parser.add_argument("--version", type=int, help="with --month/--year: refresh only that month")
+    parser.add_argument("--month", type=int)
+    parser.add_argument("--year", type=int)
+    args = parser.parse_args()
+    if args.version is not None and args.month and args.year:
+        refresh_months(args.version, {(args.month, args.year)})
+    else:
+        refresh_open_months()
@@ -0,0 +1,124 @@
+import argparse
+import random
+import signal
+import time
+
+from chunked_sync import DEFAULT_CHUNK_SIZE
+from sync_engine import run_sync
+from product_daily_output import STOCK_SYNC
+from jtc_plan_data import PLAN_SYNC
+
+# ==============================
+# RESIDENT SYNC SCHEDULER
+# ==============================
+# Replaces the cron entries for product_daily_output.py / jtc_plan_data.py.
+# Each job runs on its own interval; a run that hits a connection failure is
+# retried with exponential backoff. Overlap is prevented by run_sync's
+# per-job advisory lock, so a manual CLI run and the daemon never collide.
+# Every attempt lands in sync_run_history (see /api/sync-runs).
+
+STOCK_INTERVAL_MINUTES = 15
+PLAN_INTERVAL_MINUTES = 30
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 30        # 30s, 60s, 120s, ... between attempts
+BACKOFF_MAX_SECONDS = 600
+POLL_SECONDS = 5
+
+_stopping = False
+
+
+def _request_stop(signum, frame):
+    global _stopping
+    _stopping = True
+    print(f"🛑 Signal {signum} received, stopping after the current run...")
+
+
+def _sleep(seconds):
+    """Sleep in short steps so a stop signal is honoured promptly."""
+    deadline = time.monotonic() + seconds
+    while not _stopping and time.monotonic() < deadline:
+        time.sleep(min(POLL_SECONDS, deadline - time.monotonic()))
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Exponential delay before retry number `attempt` (1-based), with jitter."""
+    base = BACKOFF_SECONDS if base is None else base
+    cap = BACKOFF_MAX_SECONDS if cap is None else cap
+    delay = min(base * 2 ** (attempt - 1), cap)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def run_with_retries(job, max_attempts=MAX_ATTEMPTS, **options):
+    """
+    run_sync() until it succeeds, is skipped, fails for a non-connection
+    reason, or runs out of attempts. Returns the last run's stats.
+    """
+    if max_attempts < 1:
+        raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+    for attempt in range(1, max_attempts + 1):
+        stats = run_sync(job, attempt=attempt, **options)
+        if stats["ok"] or stats.get("skipped") or not stats.get("retryable"):
+            return stats
+        if attempt == max_attempts or _stopping:
+            break
+        delay = backoff_delay(attempt)
+        print(f"🔁 [{job['name']}] Connection failure, retry {attempt + 1}/{max_attempts} in {delay:.0f}s")
+        _sleep(delay)
+    print(f"❌ [{job['name']}] Giving up after {attempt} attempt(s)")
+    return stats
+
+
+def run_forever(schedule, **options):
+    """
+    schedule: [(job, interval_seconds), ...]. Jobs run one at a time; a job
+    that comes due while another is running starts right after it.
+    """
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    next_due = {job["name"]: time.monotonic() for job, _ in schedule}
+    print("⏰ Sync daemon started: " + ", ".join(
+        f"{job['name']} every {interval / 60:g} min" for job, interval in schedule))
+
+    while not _stopping:
+        for job, interval in schedule:
+            if _stopping:
+                break
+            if time.monotonic() < next_due[job["name"]]:
+                continue
+            run_with_retries(job, **options)
+            # Next slot counts from the end of this run so a slow run can't pile up
+            next_due[job["name"]] = time.monotonic() + interval
+        _sleep(max(min(next_due.values()) - time.monotonic(), 0))
+
+    print("👋 Sync daemon stopped")
+
+
+# ===========================================
+# RUN
+# ===========================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduled MAPS -> Yollink sync daemon")
+    parser.add_argument("--stock-every", type=float, default=STOCK_INTERVAL_MINUTES, help="minutes")
+    parser.add_argument("--plan-every", type=float, default=PLAN_INTERVAL_MINUTES, help="minutes")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--backoff", type=float, default=BACKOFF_SECONDS, help="first retry delay, seconds")
+    parser.add_argument("--stream", action="store_true", help="read MAPS in bounded-memory chunks")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--once", action="store_true", help="run every job once and exit")
+    args = parser.parse_args()
+    if args.max_attempts < 1:
+        parser.error("--max-attempts must be at least 1")
+    BACKOFF_SECONDS = args.backoff
+
+    schedule = [
+        (STOCK_SYNC, args.stock_every * 60),
+        (PLAN_SYNC, args.plan_every * 60),
+    ]
+    options = {"streaming": args.stream, "chunk_size": args.chunk_size}
+
+    if args.once:
+        for job, _ in schedule:
+            run_with_retries(job, max_attempts=args.max_attempts, **options)
+    else:
+        run_forever(schedule, max_attempts=args.max_attempts, **options)
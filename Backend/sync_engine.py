@@ -0,0 +1,393 @@
+import json
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+
+import MAPS_CONN2 as Maps
+import y_data as Yollink
+from bulk_loader import copy_upsert
+from chunked_sync import read_sql_chunks, split_changes, DEFAULT_CHUNK_SIZE
+from row_digest import row_digest
+from sync_watermark import get_watermark, save_watermark, needs_full_reconcile
+
+# ==============================
+# GENERIC MAPS -> YOLLINK TABLE SYNC
+# ==============================
+# A job is a plain dict:
+#
+#   {
+#       "name":             "stock",                  # watermark / log name
+#       "source_sql":       "SELECT ... AS Watermark, ... WHERE ...",
+#       "watermark_column": "st.Id",                  # MAPS expression behind Watermark
+#       "target_table":     "yollink_output",
+#       "key":              "stockid",                # source key column
+#       "columns":          {source column: target column, ...},  # incl. key
+#       "digest_columns":   [...],                    # optional, default: all non-key columns
+#       "column_types":     {source column: "number" | "datetime"},  # digest normalisation,
+#                                                     # undeclared columns hash as "text"
+#       "after_sync":       [fn, ...],                # optional, fn(stats) after a successful run
+#   }
+#
+# source_sql must select the watermark as "Watermark" and end in a WHERE
+# clause, so the engine can append "AND <watermark_column> > ?".
+# The target needs a unique index on its key and a row_digest BIGINT column.
+
+# Failures worth retrying (server down, network drop, busy MAPS stand-in);
+# anything else is a bug
+RETRYABLE_ERRORS = (
+    ConnectionError,
+    psycopg2.OperationalError,
+    psycopg2.InterfaceError,
+) + Maps.RETRYABLE_ERRORS
+
+
+def is_retryable(error):
+    return isinstance(error, RETRYABLE_ERRORS) or Maps.is_retryable(error)
+
+
+def _digest_columns(job):
+    """{column: digest type} of the columns feeding row_digest."""
+    columns = job.get("digest_columns") or [c for c in job["columns"] if c != job["key"]]
+    types = job.get("column_types", {})
+    return {c: types.get(c, "text") for c in columns}
+
+
+def _target_key(job):
+    return job["columns"][job["key"]]
+
+
+def _timed(phases, name, fn, *args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+
+
+# ==============================
+# EXTRACT
+# ==============================
+def build_source_sql(job, since=None):
+    sql = Maps.adapt_sql(job["source_sql"]).rstrip().rstrip(";")
+    params = []
+    if since is not None:
+        sql += f" AND {job['watermark_column']} > ?"
+        params.append(int(since))
+    return sql, params
+
+
+def extract_source(job, since=None):
+    """
+    Whole MAPS result for the job (rows past `since`), with row_digest added.
+    """
+    sql, params = build_source_sql(job, since)
+    conn = Maps.get_connection()
+    try:
+        df = pd.read_sql(sql, conn, params=params or None)
+    finally:
+        conn.close()
+    df["row_digest"] = row_digest(df, _digest_columns(job))
+    print(f"✅ [{job['name']}] MAPS extracted: {len(df)} rows")
+    return df
+
+
+def extract_target(job, keys=None):
+    """
+    Narrow key-indexed snapshot of the target: key -> row_digest, one row
+    per key (the first of any duplicates), ready for split_changes().
+    keys restricts it to those keys. NULL digests read as 0 (= changed).
+    """
+    target_key = _target_key(job)
+    sql = f"SELECT {target_key}, COALESCE(row_digest, 0) AS row_digest FROM {job['target_table']}"
+    params = None
+    if keys is not None:
+        sql += f" WHERE {target_key} = ANY(%s)"
+        params = ([int(k) for k in keys],)
+
+    conn = Yollink.require_connection()
+    try:
+        df = pd.read_sql(sql, conn, params=params)
+    finally:
+        conn.close()
+    print(f"✅ [{job['name']}] Yollink extracted: {len(df)} keys")
+    df = df.set_index(target_key)
+    return df[~df.index.duplicated()]
+
+
+# ==============================
+# COMPARE + APPLY
+# ==============================
+def compare(job, df_source, snapshot):
+    """Split source rows into (new, modified) by key -> digest."""
+    return split_changes(df_source, snapshot, job["key"], {"row_digest": "row_digest"})
+
+
+def to_target_frame(job, df):
+    """Source columns (+ digest) renamed to target column names."""
+    return df[list(job["columns"]) + ["row_digest"]].rename(columns=job["columns"])
+
+
+def apply_changes(job, conn, changes):
+    """Bulk upsert changed rows into the target. Does not commit."""
+    if changes.empty:
+        return {"rows": 0, "written": 0, "seconds": 0.0, "rows_per_sec": 0.0}
+    return copy_upsert(conn, to_target_frame(job, changes), job["target_table"], key=_target_key(job))
+
+
+# ==============================
+# LOCKING + RUN HISTORY
+# ==============================
+def acquire_job_lock(job):
+    """
+    Take the job's session-level advisory lock on a dedicated Yollink
+    connection. Returns the connection holding it, or None when another run
+    of the same job (cron, daemon, manual CLI) already holds it.
+    """
+    conn = Yollink.require_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (f"sync:{job['name']}",))
+        acquired = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+    if not acquired:
+        conn.close()
+        return None
+    return conn
+
+
+def release_job_lock(job, conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", (f"sync:{job['name']}",))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def record_run(stats, started_at, attempt=1):
+    """Append one row to sync_run_history. Never raises."""
+    outcome = "ok" if stats["ok"] else ("skipped" if stats.get("skipped") else "failed")
+    try:
+        conn = Yollink.require_connection()
+    except ConnectionError as e:
+        print(f"⚠️ [{stats['job']}] Run not recorded:", e)
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO sync_run_history (
+                job_name, started_at, finished_at, duration_s, outcome, mode, attempt,
+                rows_source, rows_new, rows_modified, rows_written, phases, error
+            ) VALUES (%s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (
+            stats["job"], started_at, stats.get("seconds"), outcome, stats["mode"], attempt,
+            stats["rows"], stats["new"], stats["modified"], stats["written"],
+            json.dumps({k: round(v, 3) for k, v in stats["phases"].items()}), stats.get("error"),
+        ))
+        conn.commit()
+    except Exception as e:
+        print(f"⚠️ [{stats['job']}] Run not recorded:", e)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# ==============================
+# RUN
+# ==============================
+def _run_batch(job, since, full, stats, phases, concurrent=True):
+    """
+    Single extract per side, one compare, one bulk apply.
+    Incremental runs read MAPS first and then only the fetched keys back
+    from Yollink. Full runs need the whole target snapshot anyway, so with
+    concurrent=True its read overlaps the MAPS extract.
+    """
+    extract_started = time.perf_counter()
+    if concurrent and full:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            source_future = pool.submit(_timed, phases, "extract_source", extract_source, job, since)
+            target_future = pool.submit(_timed, phases, "extract_target", extract_target, job)
+            df_source = source_future.result()
+            snapshot = target_future.result()
+    else:
+        df_source = _timed(phases, "extract_source", extract_source, job, since)
+        keys = None if full else df_source[job["key"]].tolist()
+        snapshot = _timed(phases, "extract_target", extract_target, job, keys)
+    phases["extract_wall"] = time.perf_counter() - extract_started
+
+    new_rows, modified_rows = _timed(phases, "compare", compare, job, df_source, snapshot)
+    changes = pd.concat([new_rows, modified_rows], ignore_index=True)
+
+    conn = Yollink.require_connection()
+    try:
+        result = _timed(phases, "apply", apply_changes, job, conn, changes)
+        conn.commit()
+    finally:
+        conn.close()
+
+    stats["rows"] = len(df_source)
+    stats["target_rows"] = len(snapshot)
+    stats["new"] = len(new_rows)
+    stats["modified"] = len(modified_rows)
+    stats["written"] = result["written"]
+    if not df_source.empty:
+        stats["watermark"] = int(df_source["Watermark"].max())
+
+
+def _run_streaming(job, since, full, stats, phases, chunk_size, concurrent=True):
+    """
+    Chunked source read; each chunk compared and applied before the next.
+    concurrent=True prefetches the next MAPS chunk (and, on full runs, loads
+    the target snapshot) while the current chunk is compared and written, so
+    at most two chunks are in memory.
+    """
+    sql, params = build_source_sql(job, since)
+    maps_conn = Maps.get_connection()
+    yollink_conn = Yollink.require_connection()
+    pool = ThreadPoolExecutor(max_workers=2) if concurrent else None
+    try:
+        chunks = read_sql_chunks(maps_conn, sql, params, chunk_size)
+
+        def fetch():
+            return _timed(phases, "extract_source", next, chunks, None)
+
+        if concurrent:
+            snapshot_future = pool.submit(_timed, phases, "extract_target", extract_target, job) if full else None
+            chunk_future = pool.submit(fetch)
+            snapshot = snapshot_future.result() if full else None
+        else:
+            snapshot = _timed(phases, "extract_target", extract_target, job) if full else None
+
+        n = 0
+        while True:
+            if concurrent:
+                chunk = _timed(phases, "extract_wait", chunk_future.result)
+                if chunk is not None:
+                    chunk_future = pool.submit(fetch)  # overlap next read with this chunk's work
+            else:
+                chunk = fetch()
+            if chunk is None:
+                break
+            n += 1
+            chunk["row_digest"] = row_digest(chunk, _digest_columns(job))
+
+            target = snapshot if full else _timed(
+                phases, "extract_target", extract_target, job, chunk[job["key"]].tolist())
+            new_rows, modified_rows = _timed(phases, "compare", compare, job, chunk, target)
+
+            changes = pd.concat([new_rows, modified_rows], ignore_index=True)
+            result = _timed(phases, "apply", apply_changes, job, yollink_conn, changes)
+            yollink_conn.commit()
+
+            chunk_mark = int(chunk["Watermark"].max())
+            if stats["watermark"] is None or chunk_mark > stats["watermark"]:
+                stats["watermark"] = chunk_mark
+            stats["rows"] += len(chunk)
+            stats["new"] += len(new_rows)
+            stats["modified"] += len(modified_rows)
+            stats["written"] += result["written"]
+            print(f"📦 [{job['name']}] Chunk {n}: {len(chunk)} rows, "
+                  f"{len(new_rows)} new, {len(modified_rows)} modified")
+            del chunk, target, new_rows, modified_rows, changes
+    finally:
+        if pool:
+            pool.shutdown(wait=True)
+        maps_conn.close()
+        yollink_conn.close()
+
+
+def run_sync(job, full_reconcile=False, streaming=False, chunk_size=DEFAULT_CHUNK_SIZE,
+             concurrent=True, attempt=1):
+    """
+    Run one sync job and return its stats:
+        {"job", "mode", "ok", "rows", "target_rows", "new", "modified",
+         "written", "watermark", "phases": {phase: seconds}, "seconds"}
+    plus "skipped" when another run holds the job lock, and "error" /
+    "retryable" on failure. Every call is recorded in sync_run_history.
+
+    Incremental by default (rows past the stored watermark); a full reconcile
+    runs when asked, on first use, or when the last one is too old.
+    concurrent=False runs the MAPS and Yollink reads one after the other,
+    which is mainly useful to measure the overlap gain.
+    """
+    started = time.perf_counter()
+    started_at = datetime.now()
+    phases = {}
+    stats = {
+        "job": job["name"], "mode": None, "ok": False, "rows": 0, "target_rows": None,
+        "new": 0, "modified": 0, "written": 0, "watermark": None, "phases": phases,
+    }
+    lock_conn = None
+    try:
+        lock_conn = acquire_job_lock(job)
+        if lock_conn is None:
+            stats["skipped"] = True
+            stats["error"] = "another run holds the job lock"
+            print(f"⏭️ [{job['name']}] Skipped: another run is still in progress")
+            return stats
+
+        print(f"🚀 [{job['name']}] Starting synchronization...")
+        watermark = get_watermark(job["name"])
+        full = full_reconcile or needs_full_reconcile(watermark)
+        since = None if full else watermark["last_value"]
+        stats["mode"] = ("full" if full else "incremental") \
+            + (" / streaming" if streaming else "") \
+            + (" / concurrent" if concurrent else " / sequential")
+        print(f"🔖 [{job['name']}] Mode: {'full reconcile' if full else f'incremental since {since}'}")
+
+        if streaming:
+            _run_streaming(job, since, full, stats, phases, chunk_size, concurrent)
+        else:
+            _run_batch(job, since, full, stats, phases, concurrent)
+
+        # Reached only when extract and write both succeeded; any failure
+        # above skips this so the next run retries from the same watermark
+        save_watermark(job["name"], stats["watermark"], full=full)
+        stats["ok"] = True
+
+        # Derived tables; the sync itself already committed
+        for hook in job.get("after_sync", []):
+            _timed(phases, "after_sync", hook, stats)
+    except Exception as e:
+        stats["error"] = str(e)
+        stats["retryable"] = is_retryable(e)
+        print(f"❌ [{job['name']}] Sync failed:", e)
+        traceback.print_exc()
+    finally:
+        if lock_conn is not None:
+            try:
+                release_job_lock(job, lock_conn)
+            except Exception as e:
+                print(f"⚠️ [{job['name']}] Lock release failed (dropped with the connection):", e)
+        stats["seconds"] = time.perf_counter() - started
+        print_summary(stats)
+        record_run(stats, started_at, attempt)
+    return stats
+
+
+def print_summary(stats):
+    if stats.get("skipped"):
+        return
+    print(f"🎯 [{stats['job']}] {'OK' if stats['ok'] else 'FAILED'} ({stats['mode']}): "
+          f"{stats['rows']} source rows, {stats['new']} new, {stats['modified']} modified, "
+          f"{stats['written']} written in {stats.get('seconds', 0.0):.2f}s")
+    phases = stats["phases"]
+    for phase, seconds in phases.items():
+        print(f"   ⏱️ {phase:<15} {seconds:8.2f}s")
+
+    # Time saved by overlapping the two servers' network waits
+    reads = phases.get("extract_source", 0.0) + phases.get("extract_target", 0.0)
+    if "extract_wall" in phases:
+        waited = phases["extract_wall"]
+    elif "extract_wait" in phases:
+        waited = phases["extract_wait"] + phases.get("extract_target", 0.0)
+    else:
+        return
+    stats["overlap_gain"] = max(reads - waited, 0.0)
+    print(f"   ⚡ overlap gain    {stats['overlap_gain']:8.2f}s "
+          f"(reads {reads:.2f}s, waited {waited:.2f}s)")
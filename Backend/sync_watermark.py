@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+import y_data as Yollink
+
+# ==============================
+# SYNC HIGH-WATER MARKS
+# ==============================
+# One row per sync job in Yollink's sync_watermark table (see db_schema.py):
+#   last_value      highest source watermark (Id / rowversion) applied so far
+#   last_success_at end of the last successful run
+#   last_full_at    end of the last full reconcile (safety net for updates a
+#                   watermark cannot see, e.g. edits to already-synced rows)
+
+FULL_RECONCILE_EVERY = timedelta(hours=24)
+
+
+def get_watermark(job_name):
+    """
+    Return {"last_value", "last_success_at", "last_full_at"} or None.
+    """
+    conn = Yollink.require_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT last_value, last_success_at, last_full_at
+            FROM sync_watermark
+            WHERE job_name = %s
+        """, (job_name,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+    if not row:
+        return None
+    return {"last_value": row[0], "last_success_at": row[1], "last_full_at": row[2]}
+
+
+def needs_full_reconcile(watermark, every=FULL_RECONCILE_EVERY):
+    """No watermark yet, or the last full pass is older than `every`."""
+    if not watermark or watermark["last_value"] is None or not watermark["last_full_at"]:
+        return True
+    return datetime.now() - watermark["last_full_at"] >= every
+
+
+def save_watermark(job_name, last_value, full=False):
+    """
+    Record a successful run. `last_value` None keeps the stored value
+    (nothing new was fetched). Only call this once the rows were extracted
+    and written: a failed extract must raise, never come back as an empty
+    frame, or the run would be recorded as done with nothing fetched.
+    """
+    conn = Yollink.require_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO sync_watermark (job_name, last_value, last_success_at, last_full_at)
+            VALUES (%s, %s, NOW(), CASE WHEN %s THEN NOW() END)
+            ON CONFLICT (job_name) DO UPDATE SET
+                last_value = COALESCE(EXCLUDED.last_value, sync_watermark.last_value),
+                last_success_at = EXCLUDED.last_success_at,
+                last_full_at = COALESCE(EXCLUDED.last_full_at, sync_watermark.last_full_at)
+        """, (job_name, last_value, full))
+        conn.commit()
+        print(f"🔖 Watermark saved for {job_name}: {last_value} ({'full' if full else 'incremental'})")
+    finally:
+        cursor.close()
+        conn.close()
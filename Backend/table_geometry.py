@@ -0,0 +1,152 @@
+import threading
+
+import numpy as np
+from pdfplumber import utils
+
+# ==============================
+# TABLE GEOMETRY CACHE (per customer template)
+# ==============================
+# page.extract_table() runs pdfplumber's line-intersection table finder on
+# every page, although every DI of one customer has the same layout. The
+# first page of a template (customer code + page size) still goes through
+# the finder; what stays fixed across pages is kept:
+#
+#   columns        x of every vertical ruling line of the table
+#   part_col       (x0, x1) of the part description / number column
+#   header_height  height of the header band of that column
+#   header_rows    table rows the header band spans (keeps "row" numbering)
+#
+# Later pages are validated against a few of those ruling lines (page.lines,
+# no intersection search). The row bands are the horizontal rules crossing
+# the part column, so the table may start higher or hold fewer rows than
+# on the page it was learned from. Part cells are then read straight from
+# the chars inside each band. A page that fails validation goes back to
+# the finder and re-learns the template.
+
+TOLERANCE = 1.5          # points
+VALIDATE_COLUMNS = 4     # vertical rules checked per page (first, part column end, ..., last)
+TEXT_SETTINGS = {"x_tolerance": 3, "y_tolerance": 3}  # what extract_table() uses
+
+_cache = {}
+_cache_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "invalidated": 0}
+
+
+def template_key(customer_code, page):
+    """Cache key, or None when the customer is unknown (no caching)."""
+    if not customer_code:
+        return None
+    return customer_code, round(page.width), round(page.height)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _merge(values, tol=TOLERANCE):
+    """Sorted values with runs closer than tol collapsed to their first."""
+    merged = []
+    for v in sorted(values):
+        if not merged or v - merged[-1] > tol:
+            merged.append(v)
+    return merged
+
+
+def learn_geometry(table):
+    """Geometry dict from a pdfplumber Table (see module comment)."""
+    first = table.rows[0].cells[0]
+    if first is None:
+        return None
+    x0, top, x1, bottom = first
+    return {
+        "columns": _merge([c[0] for c in table.cells] + [c[2] for c in table.cells]),
+        "part_col": (x0, x1),
+        "header_height": bottom - top,
+        "header_rows": sum(1 for row in table.rows if row.bbox[1] < bottom - TOLERANCE),
+    }
+
+
+def _checked_columns(columns):
+    """The ruling lines validated on each page: ends of the table + a spread between."""
+    idx = np.unique(np.linspace(0, len(columns) - 1, VALIDATE_COLUMNS).round().astype(int))
+    return [columns[i] for i in idx]
+
+
+def row_bands(page, geometry):
+    """
+    [(top, bottom), ...] of the part column's rows (header band first), or
+    None when the page does not match the geometry.
+    """
+    px0, px1 = geometry["part_col"]
+    mid = (px0 + px1) / 2
+    vertical_x = []
+    part_rule = []     # (top, bottom) of the vertical rule left of the part column
+    horizontal_y = []
+    for line in page.lines:
+        if abs(line["x1"] - line["x0"]) <= TOLERANCE:
+            vertical_x.append(line["x0"])
+            if abs(line["x0"] - px0) <= TOLERANCE:
+                part_rule.append((line["top"], line["bottom"]))
+        elif abs(line["bottom"] - line["top"]) <= TOLERANCE and line["x0"] <= mid <= line["x1"]:
+            horizontal_y.append(line["top"])
+
+    vertical_x = np.array(vertical_x)
+    for x in _checked_columns(geometry["columns"]):
+        if not vertical_x.size or np.abs(vertical_x - x).min() > TOLERANCE:
+            return None
+
+    # Only rules within the table's height (not boxes elsewhere on the page)
+    table_top = min(t for t, _ in part_rule) - TOLERANCE
+    table_bottom = max(b for _, b in part_rule) + TOLERANCE
+    ys = _merge(y for y in horizontal_y if table_top <= y <= table_bottom)
+    if len(ys) < 2 or abs((ys[1] - ys[0]) - geometry["header_height"]) > TOLERANCE:
+        return None
+    return list(zip(ys[:-1], ys[1:]))
+
+
+def read_part_cells(page, geometry, bands):
+    """Text of the part column per band below the header ('' when empty)."""
+    px0, px1 = geometry["part_col"]
+    chars = [c for c in page.chars if px0 <= (c["x0"] + c["x1"]) / 2 < px1]
+    edges = np.array([bands[0][0]] + [bottom for _, bottom in bands])
+    v_mid = np.array([(c["top"] + c["bottom"]) / 2 for c in chars])
+    band_of = np.searchsorted(edges, v_mid, side="right") - 1
+
+    texts = []
+    for b in range(1, len(bands)):
+        cell_chars = [c for c, i in zip(chars, band_of) if i == b]
+        texts.append(utils.extract_text(cell_chars, **TEXT_SETTINGS) if cell_chars else "")
+    return texts
+
+
+def part_column(page, customer_code=None):
+    """
+    [(row_idx, text), ...] of the part column below the header, numbered
+    like page.extract_table()[1:]. Uses / fills the template cache.
+    """
+    key = template_key(customer_code, page)
+    with _cache_lock:
+        geometry = _cache.get(key) if key else None
+
+    if geometry is not None:
+        bands = row_bands(page, geometry)
+        if bands is not None:
+            stats["hits"] += 1
+            first_row = geometry["header_rows"]
+            return list(enumerate(read_part_cells(page, geometry, bands), start=first_row))
+        stats["invalidated"] += 1
+        print(f"📐 Table layout changed for {key[0]}, re-detecting")
+    else:
+        stats["misses"] += 1
+
+    table = page.find_table()
+    if table is None:
+        return []
+    if key:
+        learned = learn_geometry(table)
+        if learned is not None:
+            with _cache_lock:
+                _cache[key] = learned
+    rows = table.extract(**TEXT_SETTINGS)
+    return [(row_idx, row[0]) for row_idx, row in enumerate(rows[1:], start=1) if row]
@@ -1,14 +1,21 @@
+import os
 import psycopg2
 
+# Defaults point at the production server; override with YOLLINK_DB_HOST,
+# YOLLINK_DB_NAME, YOLLINK_DB_USER, YOLLINK_DB_PASSWORD and YOLLINK_DB_PORT
+# (e.g. a local PostgreSQL prepared by local_fixture.py).
+DB_SETTINGS = {
+    "host": os.environ.get("YOLLINK_DB_HOST", "10.0.100.14"),
+    "database": os.environ.get("YOLLINK_DB_NAME", "purchase_schedule"),
+    "user": os.environ.get("YOLLINK_DB_USER", "postgres"),
+    "password": os.environ.get("YOLLINK_DB_PASSWORD", "yollinkvc@2020"),
+    "port": int(os.environ.get("YOLLINK_DB_PORT", 5432)),
+}
+
+
 def get_connection():
     try:
-        conn = psycopg2.connect(
-            host="10.0.100.14",          # your PostgreSQL server IP
-            database="purchase_schedule",
-            user="postgres",
-            password="yollinkvc@2020",
-            port=5432
-        )
+        conn = psycopg2.connect(**DB_SETTINGS)
         print("✅ Database connected successfully!")
         return conn
     except psycopg2.Error as e:
@@ -16,6 +23,17 @@ def get_connection():
         return None
 
 
+def require_connection():
+    """
+    Same as get_connection(), but raise ConnectionError instead of returning
+    None, so background jobs can tell an outage apart from a bug and retry.
+    """
+    conn = get_connection()
+    if conn is None:
+        raise ConnectionError("Yollink PostgreSQL is unreachable")
+    return conn
+
+
 # Optional: quick test
 if __name__ == "__main__":
     conn = get_connection()